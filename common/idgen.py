@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+全局ID生成器
+时间有序、进程内单调递增，供CRM、客户搜索、触达系统共用
+
+ID为16位base32(Crockford小写)字符串，80位 = 48位毫秒时间戳 + 12位进程内计数 + 20位进程随机节点。
+字典序即创建顺序，可直接用于按ID做范围查询。
+"""
+
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+ID_LENGTH = 16
+
+_COUNTER_BITS = 12
+_NODE_BITS = 20
+_COUNTER_MAX = (1 << _COUNTER_BITS) - 1
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def _decode(id_str: str) -> int:
+    value = 0
+    for ch in id_str:
+        value = (value << 5) | ALPHABET.index(ch)
+    return value
+
+
+class IdGenerator:
+    """时间有序ID生成器（线程安全）"""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        """（重新）初始化；fork出的子进程中父进程的锁可能正被其他线程持有，换用新锁"""
+        self._lock = threading.Lock()
+        self._node = secrets.randbits(_NODE_BITS)
+        self._last_ms = 0
+        self._counter = 0
+
+    def new_id(self) -> str:
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._counter = 0
+            else:
+                # 同一毫秒（或时钟回拨）内递增计数，溢出时借用下一毫秒
+                self._counter += 1
+                if self._counter > _COUNTER_MAX:
+                    self._last_ms += 1
+                    self._counter = 0
+            value = (self._last_ms << (_COUNTER_BITS + _NODE_BITS)) | (self._counter << _NODE_BITS) | self._node
+        return _encode(value)
+
+
+_generator = IdGenerator()
+
+# fork出的子进程使用新的节点号，避免与父进程撞号
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_generator._reset)
+
+
+def new_id() -> str:
+    """生成新ID"""
+    return _generator.new_id()
+
+
+def id_time(id_str: str) -> datetime:
+    """ID的创建时间"""
+    return datetime.fromtimestamp((_decode(id_str) >> (_COUNTER_BITS + _NODE_BITS)) / 1000)
+
+
+def min_id_at(moment: datetime) -> str:
+    """该时刻创建的最小ID，用于按时间做ID范围查询"""
+    return _encode(int(moment.timestamp() * 1000) << (_COUNTER_BITS + _NODE_BITS))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+CRM聚合计数
+随记录变更增量维护，统计/漏斗/来源分析无需扫描全表
+"""
+
+from collections import Counter
+from typing import Dict
+
+from indexes import RecordView
+
+
+class CRMAggregates(RecordView):
+    """状态、意向、来源与成交金额的实时计数"""
+
+    def __init__(self, won_status: str):
+        self.won_status = won_status
+        self.clear()
+
+    def clear(self):
+        self.customer_total = 0
+        self.by_status: Counter = Counter()            # status -> 数量
+        self.by_intent: Counter = Counter()            # intent_level -> 数量
+        self.by_source: Dict[str, Dict[str, int]] = {}  # source -> {'total', 'won'}
+        self.deal_count = 0
+        self.deal_amount = 0
+        self.deal_commission = 0
+
+    def _apply_customer(self, customer, sign: int):
+        self.customer_total += sign
+        self.by_status[customer.status] += sign
+        self.by_intent[customer.intent_level] += sign
+
+        source = customer.source or '未知'
+        stats = self.by_source.setdefault(source, {'total': 0, 'won': 0})
+        stats['total'] += sign
+        if customer.status == self.won_status:
+            stats['won'] += sign
+        if stats['total'] <= 0:
+            del self.by_source[source]
+
+    def add_customer(self, customer):
+        self._apply_customer(customer, 1)
+
+    def remove_customer(self, customer):
+        self._apply_customer(customer, -1)
+
+    def add_deal(self, deal):
+        self.deal_count += 1
+        self.deal_amount += deal.amount
+        self.deal_commission += deal.commission
+
+    def remove_deal(self, deal):
+        self.deal_count -= 1
+        self.deal_amount -= deal.amount
+        self.deal_commission -= deal.commission
+
+    def count_status(self, *statuses: str) -> int:
+        """若干状态的客户总数"""
+        return sum(self.by_status[s] for s in statuses)
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+CRM性能基准
+生成合成数据，测量crm_cli.py各命令的启动延迟、记录内存占用、写入吞吐、常驻服务延迟，
+以及CRMSystem各接口(加载/保存/增删查/统计/导入)随数据量的耗时；结果可输出为JSON与旧版本对比
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, field, fields, make_dataclass, MISSING
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+import crm
+import crm_cli
+from crm import Customer, Followup, Deal, CustomerStatus, IntentLevel, ProductType, MODELS
+from storage import create_storage
+
+BASE_DIR = Path(__file__).resolve().parent
+CLI = BASE_DIR / "crm_cli.py"
+SERVER = BASE_DIR / "crm_server.py"
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红鹏飞建国文辉斌志宇浩然欣怡子涵梓轩"
+TITLES = ["先生", "女士", "老板", "同学", "总", "姐", "哥"]
+# 与客户搜索(customer_search.Source)输出的来源一致，另有线下转介绍与未知来源
+SOURCES = ["百度搜索", "知乎", "抖音搜索", "小红书", "贴吧", "58同城", "转介绍", ""]
+DESCRIPTIONS = [
+    "征信有{n}次逾期，急需{a}万周转",
+    "有一套价值{a}0万的房产，想做抵押经营贷",
+    "公积金缴存{n}年，想了解信用贷额度",
+    "准备买车，首付不够，需要{a}万车贷",
+    "小微企业主，流水稳定，需要{a}万经营周转",
+    "装修需要{a}万，想问哪个银行利息低",
+]
+
+
+def random_name(rng: random.Random) -> str:
+    """七成为姓+名，三成为网络线索常见的姓+称呼"""
+    if rng.random() < 0.3:
+        return rng.choice(SURNAMES) + rng.choice(TITLES)
+    return rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+
+
+def random_phone(rng: random.Random) -> str:
+    return f"1{rng.choice('3456789')}{rng.randint(0, 999999999):09d}"
+
+
+def generate_dataset(n: int, seed: int = 42) -> Tuple[List[Customer], List[Followup], List[Deal]]:
+    """生成n个客户及其跟进、成交记录"""
+    rng = random.Random(seed)
+    statuses = [s.value for s in CustomerStatus]
+    intents = [i.value for i in IntentLevel]
+    products = [p.value for p in ProductType]
+    start = datetime(2025, 1, 1)
+
+    customers, followups, deals = [], [], []
+    for i in range(n):
+        created = start + timedelta(minutes=rng.randint(0, 400 * 24 * 60))
+        status = rng.choice(statuses)
+        next_followup = 0
+        if status not in (CustomerStatus.CLOSED_WON.value, CustomerStatus.CLOSED_LOST.value):
+            next_followup = int((created + timedelta(days=rng.randint(1, 60))).timestamp())
+        customer = Customer(
+            id=f"c{i:07d}",
+            name=random_name(rng),
+            phone=random_phone(rng),
+            source=rng.choice(SOURCES),
+            status=status,
+            intent_level=rng.choice(intents),
+            product_type=rng.choice(products),
+            amount=rng.randint(1, 200) * 10000,
+            term=rng.choice([12, 24, 36, 60, 120]),
+            description=rng.choice(DESCRIPTIONS).format(n=rng.randint(1, 5), a=rng.randint(5, 100)),
+            created_at=int(created.timestamp()),
+            updated_at=int(created.timestamp()),
+            next_followup=next_followup,
+            converted_at=int((created + timedelta(days=30)).timestamp())
+            if status == CustomerStatus.CLOSED_WON.value else 0,
+        )
+        customers.append(customer)
+
+        for j in range(rng.randint(0, 10)):
+            followups.append(Followup(
+                id=f"f{i:07d}{j:02d}",
+                customer_id=customer.id,
+                type=rng.choice(["电话", "微信", "面谈"]),
+                content="沟通贷款需求，客户表示会考虑",
+                created_at=int((created + timedelta(days=j)).timestamp()),
+            ))
+
+        if status == CustomerStatus.CLOSED_WON.value:
+            deals.append(Deal(
+                id=f"d{i:07d}",
+                customer_id=customer.id,
+                product_name="信用贷",
+                bank=rng.choice(["工商银行", "建设银行", "招商银行", "农业银行"]),
+                amount=customer.amount,
+                commission=customer.amount * 0.01,
+                rate=round(rng.uniform(3, 8), 2),
+                term=customer.term,
+                closed_at=int((created + timedelta(days=30)).timestamp()),
+            ))
+
+    return customers, followups, deals
+
+
+def generate_leads(n: int, customers: List[Customer], seed: int = 11) -> List[Dict]:
+    """客户搜索输出格式的线索，约两成与已有客户重复(同电话或同姓名+来源)"""
+    rng = random.Random(seed)
+    intents = ['高', '中', '低']
+    leads = []
+    for i in range(n):
+        lead = {
+            'id': f"l{i:07d}",
+            'name': random_name(rng),
+            'phone': random_phone(rng) if rng.random() < 0.6 else "",
+            'source': rng.choice(SOURCES[:6]),
+            'intent_level': rng.choice(intents),
+            'content': rng.choice(DESCRIPTIONS).format(n=rng.randint(1, 5), a=rng.randint(5, 100)),
+            'amount': rng.randint(1, 200) * 10000,
+        }
+        if customers and rng.random() < 0.2:
+            existing = rng.choice(customers)
+            if existing.phone and rng.random() < 0.5:
+                lead['phone'] = existing.phone
+            else:
+                lead['name'], lead['source'] = existing.name, existing.source
+        leads.append(lead)
+    return leads
+
+
+def write_dataset(data_dir: Path, backend: str, dataset: Tuple[List, List, List]):
+    """把合成数据写入指定后端"""
+    storage = create_storage(backend, data_dir, MODELS)
+    for kind, records in zip(('customers', 'followups', 'deals'), dataset):
+        storage.replace_all(kind, records)
+    storage.close()
+
+
+def time_cli(data_dir: Path, backend: str, args: List[str], repeat: int) -> float:
+    """运行crm_cli.py，返回中位耗时(毫秒)"""
+    env = dict(os.environ, CRM_DATA_DIR=str(data_dir), CRM_STORAGE=backend)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(CLI), *args], env=env, cwd=BASE_DIR,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 1)
+
+
+def bench_startup(sizes: List[int], backends: List[str], repeat: int) -> List[Dict]:
+    """CLI启动延迟随数据量的变化"""
+    results = []
+    for size in sizes:
+        dataset = generate_dataset(size)
+        customer_id = dataset[0][size // 2].id
+        commands = {
+            'get': ['get', customer_id],
+            'pending': ['pending'],
+            'stats': ['stats'],
+        }
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                data_dir = Path(tmp)
+                write_dataset(data_dir, backend, dataset)
+                row = {'size': size, 'backend': backend}
+                for name, args in commands.items():
+                    row[name] = time_cli(data_dir, backend, args, repeat)
+                results.append(row)
+                print(f"  {size:>8} {backend:<7} " + " ".join(f"{k}={row[k]}ms" for k in commands))
+    return results
+
+
+def legacy_model(model: type) -> type:
+    """旧版记录表示: 普通dataclass(实例__dict__，字符串不驻留)"""
+    spec = []
+    for f in fields(model):
+        if f.default is not MISSING:
+            spec.append((f.name, f.type, field(default=f.default)))
+        elif f.default_factory is not MISSING:
+            spec.append((f.name, f.type, field(default_factory=f.default_factory)))
+        else:
+            spec.append((f.name, f.type))
+    return make_dataclass(f"Legacy{model.__name__}", spec)
+
+
+def measure_load(model: type, text: str) -> Tuple[int, float]:
+    """从JSON文本构造记录，返回(常驻内存字节, 耗时秒)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = [model(**r) for r in json.loads(text)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current, elapsed
+
+
+def bench_memory(sizes: List[int]) -> List[Dict]:
+    """旧版与紧凑记录表示的内存对比"""
+    results = []
+    for size in sizes:
+        customers, _, _ = generate_dataset(size)
+        text = json.dumps([asdict(c) for c in customers], ensure_ascii=False)
+        del customers
+        row = {'size': size}
+        for label, model in (('legacy', legacy_model(Customer)), ('compact', Customer)):
+            current, elapsed = measure_load(model, text)
+            row[f"{label}_mb"] = round(current / 1024 / 1024, 1)
+            row[f"{label}_load_s"] = round(elapsed, 2)
+        row['saving'] = f"{(1 - row['compact_mb'] / row['legacy_mb']) * 100:.0f}%"
+        results.append(row)
+        print(f"  {size:>8} legacy={row['legacy_mb']}MB compact={row['compact_mb']}MB "
+              f"(节省 {row['saving']}) load {row['legacy_load_s']}s / {row['compact_load_s']}s")
+    return results
+
+
+def bench_mutations(sizes: List[int], backends: List[str], ops: int) -> List[Dict]:
+    """逐条add_followup（每次落盘）的吞吐"""
+    results = []
+    for size in sizes:
+        dataset = generate_dataset(size)
+        rng = random.Random(7)
+        targets = [c.id for c in rng.sample(dataset[0], min(ops, size))]
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                data_dir = Path(tmp)
+                write_dataset(data_dir, backend, dataset)
+                crm.DATA_DIR = data_dir
+                system = crm.CRMSystem(backend)
+                system._require('customers', 'followups')  # 加载不计入写入耗时
+
+                start = time.perf_counter()
+                for i in range(ops):
+                    system.add_followup(targets[i % len(targets)], "电话", "基准测试跟进")
+                elapsed = time.perf_counter() - start
+                system.storage.close()
+
+                row = {'size': size, 'backend': backend, 'ops': ops,
+                       'ops_per_s': round(ops / elapsed, 1), 'ms_per_op': round(elapsed / ops * 1000, 2)}
+                results.append(row)
+                print(f"  {size:>8} {backend:<8} {row['ops_per_s']:>10} ops/s  {row['ms_per_op']}ms/op")
+    return results
+
+
+def bench_server(sizes: List[int], backends: List[str], repeat: int) -> List[Dict]:
+    """经常驻服务执行命令的延迟: CLI端到端 与 socket往返(不含解释器启动)"""
+    results = []
+    for size in sizes:
+        dataset = generate_dataset(size)
+        customer_id = dataset[0][size // 2].id
+        commands = {
+            'get': ['get', customer_id],
+            'stats': ['stats'],
+            'search': ['search', '王', '--size=20'],
+        }
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                data_dir = Path(tmp)
+                write_dataset(data_dir, backend, dataset)
+                env = dict(os.environ, CRM_DATA_DIR=str(data_dir), CRM_STORAGE=backend)
+                server = subprocess.Popen([sys.executable, str(SERVER), 'start'], env=env, cwd=BASE_DIR,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                crm_cli.SOCKET_PATH = data_dir / "crm.sock"
+                try:
+                    start = time.perf_counter()
+                    while crm_cli.request_server('status', []) is None:
+                        if server.poll() is not None:
+                            raise RuntimeError("CRM server exited during warm-up")
+                        time.sleep(0.2)
+                    row = {'size': size, 'backend': backend,
+                           'warm_up_s': round(time.perf_counter() - start, 1)}
+                    for name, args in commands.items():
+                        row[f"cli_{name}"] = time_cli(data_dir, backend, args, repeat)
+                        samples = []
+                        for _ in range(repeat * 10):
+                            t = time.perf_counter()
+                            crm_cli.request_server(args[0], args[1:])
+                            samples.append((time.perf_counter() - t) * 1000)
+                        row[f"rtt_{name}"] = round(statistics.median(samples), 2)
+                finally:
+                    crm_cli.request_server('shutdown', [])
+                    server.wait(timeout=60)
+                results.append(row)
+                print(f"  {size:>8} {backend:<8} warm-up {row['warm_up_s']}s  " +
+                      " ".join(f"{k}: cli={row[f'cli_{k}']}ms rtt={row[f'rtt_{k}']}ms" for k in commands))
+    return results
+
+
+def time_call(func, repeat: int) -> float:
+    """调用func repeat次，返回中位耗时(毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def bench_api(sizes: List[int], backends: List[str], repeat: int, ops: int) -> List[Dict]:
+    """CRMSystem各接口的进程内耗时(毫秒)
+
+    load/save为整库加载与全量写回；add_*为单条写入(含落盘)的中位耗时；
+    search_first包含首次建立检索索引；import为导入一个线索文件的总耗时
+    """
+    results = []
+    for size in sizes:
+        dataset = generate_dataset(size)
+        rng = random.Random(7)
+        targets = [c.id for c in rng.sample(dataset[0], min(ops, size))]
+        leads = generate_leads(max(100, min(size // 10, 10000)), dataset[0])
+        heavy_repeat = repeat if size < 100000 else 1  # 大数据量的整库操作只测一次
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                data_dir = Path(tmp)
+                write_dataset(data_dir, backend, dataset)
+                crm.DATA_DIR = data_dir
+                leads_file = data_dir / "leads_bench.json"
+                leads_file.write_text(json.dumps(leads, ensure_ascii=False), encoding='utf-8')
+                row = {'size': size, 'backend': backend}
+
+                system = crm.CRMSystem(backend)
+                row['load_ms'] = time_call(system.load_data, heavy_repeat)
+                row['save_ms'] = time_call(system.save_all, heavy_repeat)
+
+                counter = iter(range(10 ** 9))
+                row['add_customer_ms'] = time_call(
+                    lambda: system.add_customer(f"基准{next(counter)}", random_phone(rng), "百度搜索"), ops)
+                targets_iter = iter(targets * (ops // len(targets) + 1))
+                row['add_followup_ms'] = time_call(
+                    lambda: system.add_followup(next(targets_iter), "电话", "基准测试跟进"), ops)
+
+                row['search_first_ms'] = time_call(lambda: system.search_customers("逾期"), 1)
+                row['search_ms'] = time_call(lambda: system.search_customers("逾期 经营", intent="高意向"), repeat)
+                row['search_filter_ms'] = time_call(lambda: system.search_customers(status="跟进中", limit=20), repeat)
+                row['stats_ms'] = time_call(system.get_statistics, repeat)
+                row['pending_ms'] = time_call(lambda: system.get_pending_followups(days=7), repeat)
+
+                row['import_leads'] = len(leads)
+                row['import_ms'] = time_call(lambda: system.import_from_search(str(leads_file)), 1)
+                system.storage.close()
+
+                results.append(row)
+                print(f"  {size:>8} {backend:<8} " +
+                      " ".join(f"{k[:-3]}={v}" for k, v in row.items() if k.endswith('_ms')) + " (ms)")
+    return results
+
+
+# 结果行中的参数字段（不参与对比）
+PARAM_KEYS = ('size', 'backend', 'ops', 'import_leads')
+
+
+def compare_results(baseline: Dict, results: List[Dict]):
+    """与基线JSON中(size, backend)相同的行逐项对比，打印耗时比值"""
+    base_rows = {(r.get('size'), r.get('backend')): r for r in baseline.get('results', [])}
+    print(f"\n📊 对比基线 ({baseline.get('revision') or '?'} @ {baseline.get('time', '?')}):")
+    for row in results:
+        base = base_rows.get((row.get('size'), row.get('backend')))
+        if not base:
+            continue
+        changes = []
+        for key, value in row.items():
+            old = base.get(key)
+            if key in PARAM_KEYS or not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            ratio = f"{value / old:.2f}x" if old else "-"
+            changes.append(f"{key}={old}→{value} ({ratio})")
+        label = f"{row.get('size', '')} {row.get('backend', '')}".strip()
+        print(f"  {label}: " + ", ".join(changes))
+
+
+def git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.strip()
+
+
+SUITES = {
+    'startup': lambda args: bench_startup(args.sizes, args.backends, args.repeat),
+    'memory': lambda args: bench_memory(args.sizes),
+    'mutations': lambda args: bench_mutations(args.sizes, args.backends, args.ops),
+    'server': lambda args: bench_server(args.sizes, args.backends, args.repeat),
+    'api': lambda args: bench_api(args.sizes, args.backends, args.repeat, args.ops),
+}
+
+# 各项目默认参数: (sizes, backends)
+DEFAULTS = {
+    'startup': ("1000,10000,50000", "json,sqlite"),
+    'memory': ("100000", ""),
+    'mutations': ("10000", "json,journal,sqlite"),
+    'server': ("100000", "journal"),
+    'api': ("1000,10000,100000", "journal,sqlite"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRM性能基准")
+    parser.add_argument('suite', choices=list(SUITES), help="基准项目")
+    parser.add_argument('--sizes', help="客户数量，逗号分隔 (默认见DEFAULTS)")
+    parser.add_argument('--backends', help="存储后端，逗号分隔 (默认见DEFAULTS)")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数")
+    parser.add_argument('--ops', type=int, default=50, help="mutations/api: 写入次数")
+    parser.add_argument('--output', help="结果JSON输出路径")
+    parser.add_argument('--compare', help="与之前输出的结果JSON对比")
+    args = parser.parse_args()
+
+    default_sizes, default_backends = DEFAULTS[args.suite]
+    args.sizes = [int(s) for s in (args.sizes or default_sizes).split(',')]
+    args.backends = (args.backends or default_backends).split(',')
+
+    print(f"\n⏱️ CRM基准: {args.suite}")
+    results = SUITES[args.suite](args)
+
+    report = {
+        'suite': args.suite,
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\n📄 结果: {args.output}")
+    if args.compare:
+        compare_results(json.loads(Path(args.compare).read_text(encoding='utf-8')), results)
+
+
+if __name__ == '__main__':
+    main()
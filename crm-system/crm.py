@@ -4,20 +4,40 @@
 管理客户全生命周期
 """
 
-import json
+import os
 import re
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from enum import Enum
+from contextlib import contextmanager
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from idgen import new_id
+
+from aggregates import CRMAggregates
+from dedup import AUTO_MERGE_SCORE, MIN_SCORE, CustomerDeduplicator, MergeCandidate
+from exporter import CustomerExporter, EXPORT_STATE_FILE, read_watermark, write_watermark
+from importer import LeadImporter
+from indexes import CRMIndex
+from pending_queue import PendingQueue
+from rollups import DailyRollups, DERIVED_METRICS, DIMENSIONS, INTERVALS, METRICS, ROLLUP_FILE
+from search_index import SearchIndex
+from storage import COLLECTIONS, ConflictError, create_storage
+from timestamps import (day_start, day_to_str, format_date, local_day, now_ts, parse_ts,
+                        parse_ts_lenient, str_to_day, today as today_day)
+
 # 配置
-DATA_DIR = Path("/home/codespace/clawd/crm-system/data")
+DATA_DIR = Path(os.environ.get("CRM_DATA_DIR", "/home/codespace/clawd/crm-system/data"))
 LOG_DIR = Path("/home/codespace/clawd/crm-system/logs")
 TEMPLATE_DIR = Path("/home/codespace/clawd/crm-system/templates")
 
+# 存储后端: journal(JSON快照+追加日志) / json / sqlite
+STORAGE_BACKEND = os.environ.get("CRM_STORAGE", "journal")
+
 # 创建目录
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -66,7 +86,66 @@ class ProductType(Enum):
     OTHER = "其他"
 
 
-@dataclass
+# 已进入销售流程的状态（转化率分母）
+CONTACTED_STATUSES = (
+    CustomerStatus.CONTACTED.value, CustomerStatus.FOLLOWING.value,
+    CustomerStatus.QUALIFIED.value, CustomerStatus.PROPOSAL.value,
+    CustomerStatus.NEGOTIATION.value, CustomerStatus.CLOSED_WON.value,
+)
+
+
+# 取值重复度高的字段，加载时驻留(intern)以共享字符串对象
+INTERNED_FIELDS = {
+    'customers': ('source', 'status', 'intent_level', 'product_type'),
+    'followups': ('type', 'next_time', 'created_by'),
+    'deals': ('product_name', 'bank', 'status'),
+}
+
+# 时间字段: epoch秒(int)，0表示未设置；只在显示/导出时格式化
+TIME_FIELDS = {
+    'customers': ('created_at', 'updated_at', 'last_contact', 'next_followup', 'converted_at'),
+    'followups': ('created_at',),
+    'deals': ('closed_at',),
+}
+
+
+def _intern_fields(record, names: tuple):
+    for name in names:
+        value = getattr(record, name)
+        if type(value) is str and value:
+            setattr(record, name, sys.intern(value))
+
+
+def _parse_time_fields(record, names: tuple):
+    """旧数据中的字符串时间转为epoch秒"""
+    for name in names:
+        value = getattr(record, name)
+        if type(value) is not int:
+            setattr(record, name, parse_ts_lenient(value))
+
+
+# 已结束的状态（不再跟进）
+CLOSED_STATUSES = (CustomerStatus.CLOSED_WON.value, CustomerStatus.CLOSED_LOST.value)
+
+# 合并重复客户时保留流程最靠后的状态（流失优先级最低）
+MERGE_STATUS_ORDER = (
+    CustomerStatus.CLOSED_LOST.value, CustomerStatus.NEW.value, CustomerStatus.CONTACTED.value,
+    CustomerStatus.FOLLOWING.value, CustomerStatus.QUALIFIED.value, CustomerStatus.PROPOSAL.value,
+    CustomerStatus.NEGOTIATION.value, CustomerStatus.CLOSED_WON.value,
+)
+
+# 合并重复客户时保留较高的意向
+MERGE_INTENT_ORDER = tuple(level.value for level in reversed(IntentLevel))
+
+# 时间窗口报告: 周期 -> (名称, 天数)
+REPORT_PERIODS = {
+    'daily': ("日报", 1),
+    'weekly': ("周报", 7),
+    'monthly': ("月报", 30),
+}
+
+
+@dataclass(slots=True)
 class Customer:
     """客户"""
     id: str
@@ -91,16 +170,21 @@ class Customer:
     property_value: float = 0
     property_loan: float = 0
     
-    # 时间字段
-    created_at: str = field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M'))
-    updated_at: str = field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M'))
-    last_contact: str = ""
-    next_followup: str = ""
-    converted_at: str = ""
+    # 时间字段(epoch秒)
+    created_at: int = field(default_factory=now_ts)
+    updated_at: int = field(default_factory=now_ts)
+    last_contact: int = 0
+    next_followup: int = 0       # 下次跟进日期(当天0点)
+    converted_at: int = 0
     lost_reason: str = ""
+    version: int = 0             # 版本号(每次落盘+1，并发冲突检测)
+    
+    def __post_init__(self):
+        _intern_fields(self, INTERNED_FIELDS['customers'])
+        _parse_time_fields(self, TIME_FIELDS['customers'])
 
 
-@dataclass
+@dataclass(slots=True)
 class Followup:
     """跟进记录"""
     id: str
@@ -109,12 +193,17 @@ class Followup:
     content: str                # 跟进内容
     result: str = ""            # 跟进结果
     next_action: str = ""       # 下次行动
-    next_time: str = ""         # 下次跟进时间
-    created_at: str = field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M'))
+    next_time: str = ""         # 下次跟进时间(输入原文)
+    created_at: int = field(default_factory=now_ts)
     created_by: str = "系统"
+    version: int = 0
+    
+    def __post_init__(self):
+        _intern_fields(self, INTERNED_FIELDS['followups'])
+        _parse_time_fields(self, TIME_FIELDS['followups'])
 
 
-@dataclass
+@dataclass(slots=True)
 class Deal:
     """成交记录"""
     id: str
@@ -125,83 +214,174 @@ class Deal:
     commission: float           # 佣金
     rate: float                 # 利率
     term: int                   # 期限
-    closed_at: str = field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M'))
+    closed_at: int = field(default_factory=now_ts)
     status: str = "已放款"
+    version: int = 0
+    
+    def __post_init__(self):
+        _intern_fields(self, INTERNED_FIELDS['deals'])
+        _parse_time_fields(self, TIME_FIELDS['deals'])
+
+
+# 集合 -> 记录类型
+MODELS = {
+    'customers': Customer,
+    'followups': Followup,
+    'deals': Deal,
+}
 
 
 class CRMSystem:
     """CRM系统"""
     
-    def __init__(self):
-        self.customers: List[Customer] = []
-        self.followups: List[Followup] = []
-        self.deals: List[Deal] = []
-        self.load_data()
+    def __init__(self, backend: str = "", lazy: bool = True):
+        self.storage = create_storage(backend or STORAGE_BACKEND, DATA_DIR, MODELS)
+        
+        # 已加载的集合，None表示尚未加载（首次访问时加载）
+        self._collections: Dict[str, Optional[List]] = {kind: None for kind in COLLECTIONS}
+        
+        # 未落盘的变更: 集合 -> {记录ID: 记录} / {删除的记录ID}
+        self._dirty: Dict[str, Dict[str, object]] = {kind: {} for kind in COLLECTIONS}
+        self._deleted: Dict[str, set] = {kind: set() for kind in COLLECTIONS}
+        self._batch_depth = 0
+        
+        # 数据版本: 集合每次加载/变更+1，报告段落缓存以此判断是否失效
+        self.data_version: Dict[str, int] = {kind: 0 for kind in COLLECTIONS}
+        self._report_cache: Dict[str, tuple] = {}  # 段落 -> (缓存键, 文本)
+        
+        # 增量维护的索引/视图
+        self.index = CRMIndex()
+        self.stats = CRMAggregates(won_status=CustomerStatus.CLOSED_WON.value)
+        self.pending = PendingQueue(closed_statuses=CLOSED_STATUSES)
+        self.rollups = DailyRollups(won_status=CustomerStatus.CLOSED_WON.value)
+        self.search_index = SearchIndex()  # 首次检索时才建立
+        self._views = [self.index, self.stats, self.pending, self.rollups]
+        
+        if not lazy:
+            self.load_data()
     
     # ========== 数据加载/保存 ==========
     
+    @property
+    def customers(self) -> List[Customer]:
+        return self._ensure_loaded('customers')
+    
+    @property
+    def followups(self) -> List[Followup]:
+        return self._ensure_loaded('followups')
+    
+    @property
+    def deals(self) -> List[Deal]:
+        return self._ensure_loaded('deals')
+    
     def load_data(self):
-        """加载所有数据"""
-        self._load_customers()
-        self._load_followups()
-        self._load_deals()
-        logger.info(f"Loaded {len(self.customers)} customers, {len(self.followups)} followups, {len(self.deals)} deals")
-    
-    def _load_customers(self):
-        """加载客户"""
-        file_path = DATA_DIR / "customers.json"
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.customers = [Customer(**c) for c in data]
-    
-    def _load_followups(self):
-        """加载跟进记录"""
-        file_path = DATA_DIR / "followups.json"
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.followups = [Followup(**f) for f in data]
-    
-    def _load_deals(self):
-        """加载成交记录"""
-        file_path = DATA_DIR / "deals.json"
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.deals = [Deal(**d) for d in data]
+        """(重新)加载所有数据，丢弃未落盘的变更"""
+        self.discard()
+        for kind in COLLECTIONS:
+            self._ensure_loaded(kind)
+        logger.info(f"Loaded {len(self.customers)} customers, {len(self.followups)} followups, {len(self.deals)} deals ({self.storage.name})")
+    
+    def discard(self):
+        """丢弃未落盘的变更，已加载的集合在下次访问时从存储重新加载"""
+        self._collections = {kind: None for kind in COLLECTIONS}
+        for kind in COLLECTIONS:
+            self._dirty[kind].clear()
+            self._deleted[kind].clear()
+        for view in self._views:
+            view.clear()
+        if self.search_index in self._views:
+            self._views.remove(self.search_index)
+    
+    def _ensure_loaded(self, kind: str) -> List:
+        """首次访问时加载集合并加入视图"""
+        records = self._collections[kind]
+        if records is None:
+            self._flush_kind(kind)  # 未加载期间直接写存储的变更先落盘
+            model = MODELS[kind]
+            records = [model(**r) for r in self.storage.load(kind)]
+            self._collections[kind] = records
+            self.data_version[kind] += 1
+            for view in self._views:
+                view.load(kind, records)
+            logger.debug(f"Loaded {len(records)} {kind} ({self.storage.name})")
+        return records
+    
+    def _require(self, *kinds: str):
+        """确保集合已加载"""
+        for kind in kinds:
+            self._ensure_loaded(kind)
+    
+    def _resident(self, kind: str) -> bool:
+        """集合是否在内存中；行级存储未加载时直接读写存储，不加载全集合"""
+        if self._collections[kind] is None and not self.storage.partial:
+            self._ensure_loaded(kind)
+        return self._collections[kind] is not None
     
     def save_all(self):
         """保存所有数据"""
-        self._save_customers()
-        self._save_followups()
-        self._save_deals()
-    
-    def _save_customers(self):
-        """保存客户"""
-        file_path = DATA_DIR / "customers.json"
-        data = [asdict(c) for c in self.customers]
-        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
-    
-    def _save_followups(self):
-        """保存跟进记录"""
-        file_path = DATA_DIR / "followups.json"
-        data = [asdict(f) for f in self.followups]
-        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
-    
-    def _save_deals(self):
-        """保存成交记录"""
-        file_path = DATA_DIR / "deals.json"
-        data = [asdict(d) for d in self.deals]
-        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        for kind in COLLECTIONS:
+            self.storage.replace_all(kind, getattr(self, kind))
+            self._dirty[kind].clear()
+            self._deleted[kind].clear()
+    
+    def _mark_dirty(self, kind: str, record):
+        """标记记录已新增/修改，每次落盘版本号+1"""
+        self._deleted[kind].discard(record.id)
+        if record.id not in self._dirty[kind]:
+            record.version += 1
+        self._dirty[kind][record.id] = record
+        self.data_version[kind] += 1
+    
+    def _mark_deleted(self, kind: str, record_id: str):
+        """标记记录已删除"""
+        self._dirty[kind].pop(record_id, None)
+        self._deleted[kind].add(record_id)
+        self.data_version[kind] += 1
+    
+    def _attach(self, kind: str, record):
+        """记录加入视图"""
+        for view in self._views:
+            view.add(kind, record)
+    
+    def _detach(self, kind: str, record):
+        """记录移出视图"""
+        for view in self._views:
+            view.remove(kind, record)
+    
+    def flush(self):
+        """只写入有变更的集合/记录"""
+        for kind in COLLECTIONS:
+            self._flush_kind(kind)
+    
+    def _flush_kind(self, kind: str):
+        """写入一个集合的变更；记录已被其他进程修改时抛出ConflictError，需load_data后重试"""
+        dirty, deleted = self._dirty[kind], self._deleted[kind]
+        if not dirty and not deleted:
+            return
+        self.storage.write(kind, list(dirty.values()), list(deleted), self._collections[kind])
+        dirty.clear()
+        deleted.clear()
+    
+    @contextmanager
+    def batch(self):
+        """批量操作: 嵌套调用只在最外层结束时落盘一次；最外层出错时丢弃整批变更"""
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.discard()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.flush()
     
     # ========== 客户管理 ==========
     
     def generate_id(self) -> str:
-        """生成ID"""
-        import hashlib
-        timestamp = str(datetime.now().timestamp()).encode()
-        return hashlib.md5(timestamp).hexdigest()[:8]
+        """生成ID（时间有序，批量写入不重复）"""
+        return new_id()
     
     def add_customer(self, name: str, phone: str, source: str = "", 
                      product_type: str = "", amount: float = 0,
@@ -217,53 +397,76 @@ class CRMSystem:
             description=description,
             **kwargs
         )
-        self.customers.append(customer)
-        self.save_all()
+        with self.batch():
+            if self._resident('customers'):
+                self.customers.append(customer)
+                self._attach('customers', customer)
+            self._mark_dirty('customers', customer)
         logger.info(f"Added customer: {name} ({phone})")
         return customer
     
     def get_customer(self, customer_id: str) -> Optional[Customer]:
         """获取客户"""
-        for c in self.customers:
-            if c.id == customer_id:
-                return c
-        return None
+        if self._resident('customers'):
+            return self.index.get_customer(customer_id)
+        if customer_id in self._deleted['customers']:
+            return None
+        pending = self._dirty['customers'].get(customer_id)
+        if pending:
+            return pending
+        row = self.storage.get('customers', customer_id)
+        return Customer(**row) if row else None
     
     def search_customers(self, keyword: str = "", status: str = "", 
-                        intent: str = "", source: str = "") -> List[Customer]:
-        """搜索客户"""
-        results = self.customers
-        
-        if keyword:
-            keyword = keyword.lower()
-            results = [c for c in results if 
-                      keyword in c.name.lower() or 
-                      keyword in c.phone or 
-                      keyword in c.description.lower()]
-        
-        if status:
-            results = [c for c in results if c.status == status]
+                        intent: str = "", source: str = "",
+                        offset: int = 0, limit: int = 0) -> List[Customer]:
+        """搜索客户
         
-        if intent:
-            results = [c for c in results if c.intent_level == intent]
+        关键词检索姓名/电话/描述/标签，多个词用空格分隔(AND)，结果按相关度排序；
+        无关键词时按录入顺序。offset/limit用于分页，limit=0表示不限。
+        """
+        self._require('customers')
+        ids = self.index.ids_with(status=status, source=source, intent=intent)
         
-        if source:
-            results = [c for c in results if c.source == source]
+        if keyword:
+            if self.search_index not in self._views:
+                self.search_index.rebuild(self.customers, [], [])
+                self._views.append(self.search_index)
+            scores = self.search_index.search(keyword)
+            if ids is not None:
+                scores = {i: score for i, score in scores.items() if i in ids}
+            order = self.index.order
+            ranked = sorted(scores, key=lambda i: (-scores[i], order.get(i, 0)))
+            results = [self.index.get_customer(i) for i in ranked]
+        elif ids is None:
+            results = self.customers
+        else:
+            results = self.index.sort_by_order([self.index.get_customer(i) for i in ids])
         
+        if offset or limit:
+            results = results[offset:offset + limit] if limit else results[offset:]
         return results
     
     def update_customer(self, customer_id: str, **kwargs) -> bool:
-        """更新客户"""
+        """更新客户（时间字段可传epoch秒或 'YYYY-MM-DD[ HH:MM]' 字符串，无法识别时抛出ValueError）"""
         customer = self.get_customer(customer_id)
         if not customer:
             return False
         
-        for key, value in kwargs.items():
-            if hasattr(customer, key):
-                setattr(customer, key, value)
-        
-        customer.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
-        self.save_all()
+        resident = self._collections['customers'] is not None
+        with self.batch():
+            if resident:
+                self._detach('customers', customer)
+            for key, value in kwargs.items():
+                if key != 'id' and hasattr(customer, key):
+                    if key in TIME_FIELDS['customers']:
+                        value = parse_ts(value)
+                    setattr(customer, key, value)
+            
+            customer.updated_at = now_ts()
+            if resident:
+                self._attach('customers', customer)
+            self._mark_dirty('customers', customer)
         return True
     
     def delete_customer(self, customer_id: str) -> bool:
@@ -272,10 +475,77 @@ class CRMSystem:
         if not customer:
             return False
         
-        self.customers.remove(customer)
-        self.save_all()
+        with self.batch():
+            if self._collections['customers'] is not None:
+                self._detach('customers', customer)
+                self.customers.remove(customer)
+            self._mark_deleted('customers', customer.id)
         return True
     
+    # ========== 客户去重 ==========
+    
+    def _deduplicator(self) -> CustomerDeduplicator:
+        return CustomerDeduplicator(self, status_order=MERGE_STATUS_ORDER, intent_order=MERGE_INTENT_ORDER)
+    
+    def find_duplicates(self, min_score: float = MIN_SCORE) -> List[MergeCandidate]:
+        """疑似重复的客户对（按电话/微信/姓名+来源分块后打分），按得分从高到低"""
+        return self._deduplicator().find_candidates(self.customers, min_score)
+    
+    def merge_customers(self, keep_id: str, duplicate_ids: List[str]) -> Dict[str, int]:
+        """把重复客户合并到keep_id: 补全字段、跟进与成交改挂到保留客户、删除重复客户
+        
+        返回 merged/followups/deals 计数
+        """
+        return self.merge_customer_groups([(keep_id, duplicate_ids)])
+    
+    def merge_customer_groups(self, groups: List[tuple]) -> Dict[str, int]:
+        """批量合并 [(保留客户ID, [重复客户ID])]，客户列表只重建一次"""
+        self._require('customers', 'followups', 'deals')
+        merges = []
+        for keep_id, duplicate_ids in groups:
+            keep = self.get_customer(keep_id)
+            if not keep:
+                raise ValueError(f"Customer not found: {keep_id}")
+            duplicates = []
+            for customer_id in dict.fromkeys(duplicate_ids):
+                customer = self.get_customer(customer_id)
+                if not customer:
+                    raise ValueError(f"Customer not found: {customer_id}")
+                if customer_id != keep_id:
+                    duplicates.append(customer)
+            if duplicates:
+                merges.append((keep, duplicates))
+        
+        counts = {'merged': 0, 'followups': 0, 'deals': 0}
+        deduplicator = self._deduplicator()
+        removed = set()
+        with self.batch():
+            for keep, duplicates in merges:
+                updates = deduplicator.merged_fields(keep, duplicates)
+                for duplicate in duplicates:
+                    for kind, index in (('followups', self.index.followups_by_customer),
+                                        ('deals', self.index.deals_by_customer)):
+                        for record in list(index.get(duplicate.id, [])):
+                            self._detach(kind, record)
+                            record.customer_id = keep.id
+                            self._attach(kind, record)
+                            self._mark_dirty(kind, record)
+                            counts[kind] += 1
+                    self._detach('customers', duplicate)
+                    self._mark_deleted('customers', duplicate.id)
+                    removed.add(duplicate.id)
+                self.update_customer(keep.id, **updates)
+                logger.info(f"Merged {len(duplicates)} duplicate(s) into customer {keep.id}")
+            if removed:
+                self.customers[:] = [c for c in self.customers if c.id not in removed]
+        counts['merged'] = len(removed)
+        return counts
+    
+    def dedup_customers(self, min_score: float = AUTO_MERGE_SCORE) -> Dict[str, int]:
+        """自动合并得分不低于min_score的重复客户，返回 groups/merged/followups/deals 计数"""
+        self._require('customers', 'followups', 'deals')
+        return self._deduplicator().run(min_score)
+    
     # ========== 跟进管理 ==========
     
     def add_followup(self, customer_id: str, type: str, content: str,
@@ -290,32 +560,48 @@ class CRMSystem:
             next_action=next_action,
             next_time=next_time
         )
-        self.followups.append(followup)
+        with self.batch():
+            if self._resident('followups'):
+                self.followups.append(followup)
+                self._attach('followups', followup)
+            self._mark_dirty('followups', followup)
+            
+            # 更新客户状态
+            self.update_customer(customer_id, 
+                               status=CustomerStatus.FOLLOWING.value,
+                               last_contact=now_ts(),
+                               next_followup=self._followup_day(next_time))
         
-        # 更新客户状态
-        self.update_customer(customer_id, 
-                           status=CustomerStatus.FOLLOWING.value,
-                           last_contact=datetime.now().strftime('%Y-%m-%d %H:%M'),
-                           next_followup=next_time)
-        
-        self.save_all()
         return followup
     
+    @staticmethod
+    def _followup_day(next_time: str) -> int:
+        """下次跟进时间 -> 当天0点；空或无法识别时为未设置"""
+        ts = parse_ts_lenient(next_time)
+        return day_start(local_day(ts)) if ts else 0
+    
     def get_customer_followups(self, customer_id: str) -> List[Followup]:
         """获取客户跟进记录"""
-        return [f for f in self.followups if f.customer_id == customer_id]
+        if self._resident('followups'):
+            return list(self.index.followups_by_customer.get(customer_id, []))
+        self._flush_kind('followups')
+        rows = self.storage.find('followups', customer_id=customer_id)
+        return sorted((Followup(**r) for r in rows), key=lambda f: f.created_at)
     
-    def get_pending_followups(self) -> List[tuple]:
-        """获取待跟进客户"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        pending = []
+    def get_pending_followups(self, days: int = 0) -> List[tuple]:
+        """获取待跟进客户，返回 [(客户, 下次跟进时间)]
         
-        for c in self.customers:
-            if c.next_followup and c.next_followup <= today:
-                if c.status not in [CustomerStatus.CLOSED_WON.value, CustomerStatus.CLOSED_LOST.value]:
-                    pending.append((c, c.next_followup))
+        days=0: 今天及之前到期的客户；days=N: 截至N天后到期的客户（含已逾期）
+        """
+        until = day_start(today_day() + days + 1) - 1
         
-        return sorted(pending, key=lambda x: x[1])
+        if self._resident('customers'):
+            return self.pending.due(until)
+        
+        self._flush_kind('customers')
+        rows = self.storage.find_range('customers', 'next_followup', high=until)
+        return [(c, c.next_followup) for c in (Customer(**r) for r in rows)
+                if c.status not in CLOSED_STATUSES]
     
     # ========== 成交管理 ==========
     
@@ -332,51 +618,62 @@ class CRMSystem:
             rate=rate,
             term=term
         )
-        self.deals.append(deal)
-        
-        # 更新客户状态
-        self.update_customer(customer_id, 
-                           status=CustomerStatus.CLOSED_WON.value,
-                           converted_at=datetime.now().strftime('%Y-%m-%d'))
+        with self.batch():
+            if self._resident('deals'):
+                self.deals.append(deal)
+                self._attach('deals', deal)
+            self._mark_dirty('deals', deal)
+            
+            # 更新客户状态
+            self.update_customer(customer_id, 
+                               status=CustomerStatus.CLOSED_WON.value,
+                               converted_at=now_ts())
         
-        self.save_all()
         return deal
     
     def get_customer_deal(self, customer_id: str) -> Optional[Deal]:
         """获取客户成交记录"""
-        for d in self.deals:
-            if d.customer_id == customer_id:
-                return d
-        return None
+        if self._resident('deals'):
+            deals = self.index.deals_by_customer.get(customer_id)
+            return deals[0] if deals else None
+        self._flush_kind('deals')
+        rows = self.storage.find('deals', customer_id=customer_id)
+        return Deal(**rows[0]) if rows else None
+    
+    def get_customer_deals(self, customer_id: str) -> List[Deal]:
+        """获取客户全部成交记录"""
+        if self._resident('deals'):
+            return list(self.index.deals_by_customer.get(customer_id, []))
+        self._flush_kind('deals')
+        return [Deal(**r) for r in self.storage.find('deals', customer_id=customer_id)]
     
     # ========== 统计分析 ==========
     
     def get_statistics(self) -> Dict:
         """获取统计"""
+        self._require('customers', 'deals')
+        agg = self.stats
+        
         # 客户统计
-        total_customers = len(self.customers)
-        new_customers = len([c for c in self.customers if c.status == CustomerStatus.NEW.value])
-        following = len([c for c in self.customers if c.status == CustomerStatus.FOLLOWING.value])
-        qualified = len([c for c in self.customers if c.status == CustomerStatus.QUALIFIED.value])
-        closed_won = len([c for c in self.customers if c.status == CustomerStatus.CLOSED_WON.value])
-        closed_lost = len([c for c in self.customers if c.status == CustomerStatus.CLOSED_LOST.value])
+        total_customers = agg.customer_total
+        new_customers = agg.by_status[CustomerStatus.NEW.value]
+        following = agg.by_status[CustomerStatus.FOLLOWING.value]
+        qualified = agg.by_status[CustomerStatus.QUALIFIED.value]
+        closed_won = agg.by_status[CustomerStatus.CLOSED_WON.value]
+        closed_lost = agg.by_status[CustomerStatus.CLOSED_LOST.value]
         
         # 意向分布
-        high_intent = len([c for c in self.customers if c.intent_level == IntentLevel.HIGH.value])
-        medium_intent = len([c for c in self.customers if c.intent_level == IntentLevel.MEDIUM.value])
-        low_intent = len([c for c in self.customers if c.intent_level == IntentLevel.LOW.value])
+        high_intent = agg.by_intent[IntentLevel.HIGH.value]
+        medium_intent = agg.by_intent[IntentLevel.MEDIUM.value]
+        low_intent = agg.by_intent[IntentLevel.LOW.value]
         
         # 金额统计
-        total_amount = sum(d.amount for d in self.deals)
-        total_commission = sum(d.commission for d in self.deals)
-        avg_commission = total_commission / len(self.deals) if self.deals else 0
+        total_amount = agg.deal_amount
+        total_commission = agg.deal_commission
+        avg_commission = total_commission / agg.deal_count if agg.deal_count else 0
         
         # 转化率
-        contacted = len([c for c in self.customers if c.status in [
-            CustomerStatus.CONTACTED.value, CustomerStatus.FOLLOWING.value,
-            CustomerStatus.QUALIFIED.value, CustomerStatus.PROPOSAL.value,
-            CustomerStatus.NEGOTIATION.value, CustomerStatus.CLOSED_WON.value
-        ]])
+        contacted = agg.count_status(*CONTACTED_STATUSES)
         conversion_rate = (closed_won / contacted * 100) if contacted > 0 else 0
         
         return {
@@ -394,7 +691,7 @@ class CRMSystem:
                 'low': low_intent
             },
             'deals': {
-                'total': len(self.deals),
+                'total': agg.deal_count,
                 'total_amount': total_amount,
                 'total_commission': total_commission,
                 'avg_commission': avg_commission
@@ -408,99 +705,132 @@ class CRMSystem:
     
     def get_pipeline(self) -> Dict:
         """获取销售漏斗"""
-        pipeline = {
-            '新客户': len([c for c in self.customers if c.status == CustomerStatus.NEW.value]),
-            '已联系': len([c for c in self.customers if c.status == CustomerStatus.CONTACTED.value]),
-            '跟进中': len([c for c in self.customers if c.status == CustomerStatus.FOLLOWING.value]),
-            '已筛选': len([c for c in self.customers if c.status == CustomerStatus.QUALIFIED.value]),
-            '方案沟通': len([c for c in self.customers if c.status == CustomerStatus.PROPOSAL.value]),
-            '谈判中': len([c for c in self.customers if c.status == CustomerStatus.NEGOTIATION.value]),
-            '成交': len([c for c in self.customers if c.status == CustomerStatus.CLOSED_WON.value]),
-            '流失': len([c for c in self.customers if c.status == CustomerStatus.CLOSED_LOST.value]),
-        }
-        return pipeline
+        self._require('customers')
+        return {status.value: self.stats.by_status[status.value] for status in CustomerStatus}
     
     def get_source_stats(self) -> Dict:
         """获取来源统计"""
+        self._require('customers')
         stats = {}
-        for c in self.customers:
-            source = c.source or '未知'
-            if source not in stats:
-                stats[source] = {'total': 0, 'won': 0}
-            stats[source]['total'] += 1
-            if c.status == CustomerStatus.CLOSED_WON.value:
-                stats[source]['won'] += 1
-        
-        # 计算转化率
-        for source, data in stats.items():
-            data['rate'] = round(data['won'] / data['total'] * 100, 1) if data['total'] > 0 else 0
-        
+        for source, data in self.stats.by_source.items():
+            stats[source] = {
+                'total': data['total'],
+                'won': data['won'],
+                # 计算转化率
+                'rate': round(data['won'] / data['total'] * 100, 1) if data['total'] > 0 else 0
+            }
         return stats
     
+    def get_rollups(self) -> DailyRollups:
+        """每日汇总
+        
+        全部集合已在内存中时直接使用增量维护的视图；否则读取与当前存储一致的物化文件，
+        文件过期时加载全部集合重建并写回。
+        """
+        if all(records is not None for records in self._collections.values()):
+            return self.rollups
+        self.flush()
+        path = DATA_DIR / ROLLUP_FILE
+        stamp = self.storage.stamp()
+        rollups = DailyRollups.restore(path, stamp, won_status=CustomerStatus.CLOSED_WON.value)
+        if rollups is None:
+            self._require(*COLLECTIONS)
+            rollups = self.rollups
+            rollups.save(path, stamp)
+            logger.info(f"Materialized daily rollups ({len(rollups.days)} days)")
+        return rollups
+    
+    def get_trend(self, metric: str = "new_customers", by: str = "", interval: str = "day",
+                  since: str = "", until: str = "", days: int = 30) -> List[tuple]:
+        """趋势查询: 指标按天/周/月汇总，可按 status/source/intent/product 拆分
+        
+        未指定since时取截至until(默认今天)的最近days天。返回 [(时间段, {取值: 数值})]
+        """
+        if metric not in METRICS + DERIVED_METRICS:
+            raise ValueError(f"Unknown metric: {metric} (available: {', '.join(METRICS + DERIVED_METRICS)})")
+        if by and by not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {by} (available: {', '.join(DIMENSIONS)})")
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval: {interval} (available: {', '.join(INTERVALS)})")
+        until = until or day_to_str(today_day())
+        since = since or day_to_str(str_to_day(until) - days + 1)
+        return self.get_rollups().trend(since, until, metric, by=by, interval=interval)
+    
     # ========== 导入导出 ==========
     
-    def import_from_search(self, leads_file: str):
-        """从搜索结果导入客户"""
-        file_path = DATA_DIR / leads_file
+    def import_from_search(self, leads_file: str) -> int:
+        """从搜索结果导入客户，返回新增客户数"""
+        file_path = self._resolve_path(leads_file)
         if not file_path.exists():
             logger.error(f"File not found: {leads_file}")
             return 0
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            leads = json.load(f)
-        
-        count = 0
-        for lead in leads:
-            # 检查是否已存在
-            exists = any(c.phone == lead.get('phone', '') for c in self.customers)
-            if not exists:
-                self.add_customer(
-                    name=lead.get('name', lead.get('author', '客户')),
-                    phone=lead.get('phone', ''),
-                    source=lead.get('source', ''),
-                    description=lead.get('content', '')[:200],
-                    intent_level=lead.get('intent_level', '中意向'),
-                    amount=lead.get('amount', 0)
-                )
-                count += 1
-        
-        logger.info(f"Imported {count} customers from {leads_file}")
-        return count
+        counts = self.import_leads([file_path])
+        logger.info(f"Imported {counts['inserted']} customers from {leads_file}")
+        return counts['inserted']
+    
+    def import_leads(self, paths: List, dedup_name: bool = True) -> Dict[str, int]:
+        """流式批量导入线索文件/目录(leads_*.json, *.jsonl)
+        
+        按电话去重，dedup_name时再按规范化姓名+来源去重；重复线索补全已有客户的空字段。
+        返回 inserted/skipped/merged/invalid/files 计数；有路径不存在时不导入任何文件，抛出ValueError。
+        """
+        files = [self._resolve_path(p) for p in paths]
+        missing = [str(p) for p, f in zip(paths, files) if not f.exists()]
+        if missing:
+            raise ValueError(f"File not found: {', '.join(missing)}")
+        return LeadImporter(self, dedup_name=dedup_name).run(files)
+    
+    @staticmethod
+    def _resolve_path(path) -> Path:
+        """相对路径优先按当前目录解析，其次按数据目录"""
+        path = Path(path)
+        return path if path.exists() else DATA_DIR / path
     
     def export_to_csv(self, filename: str = "customers.csv"):
         """导出客户数据"""
-        import csv
-        
-        file_path = DATA_DIR / filename
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            # 标题行
-            writer.writerow(['ID', '姓名', '电话', '来源', '状态', '意向', '产品', '金额', '创建时间', '最后联系'])
-            # 数据行
-            for c in self.customers:
-                writer.writerow([
-                    c.id, c.name, c.phone, c.source, c.status, 
-                    c.intent_level, c.product_type, c.amount,
-                    c.created_at, c.last_contact
-                ])
-        
-        return file_path
+        return self.export_customers(filename)['path']
+    
+    def export_customers(self, filename: str = "customers.csv", columns: Optional[List[str]] = None,
+                         status: str = "", intent: str = "", source: str = "",
+                         since: str = "", until: str = "", incremental: bool = False) -> Dict:
+        """流式导出客户
+        
+        格式由扩展名决定: .csv / .jsonl，再加 .gz 则gzip压缩；相对路径写到数据目录。
+        columns可选客户字段及 followup_count/last_followup/deal_count/deal_amount/deal_commission；
+        since/until按创建日期过滤；incremental只导出上次导出(同一文件名)以来更新过的客户。
+        返回 {path, rows}。
+        """
+        file_path = Path(filename)
+        if not file_path.is_absolute():
+            file_path = DATA_DIR / file_path
+        state_file = DATA_DIR / EXPORT_STATE_FILE
+        started = now_ts()
+        exporter = CustomerExporter(
+            self, columns=columns, status=status, intent=intent, source=source, since=since, until=until,
+            changed_since=read_watermark(state_file, file_path.name) if incremental else 0,
+        )
+        rows = exporter.write(file_path)
+        if incremental:
+            write_watermark(state_file, file_path.name, started)
+        logger.info(f"Exported {rows} customers to {file_path}")
+        return {'path': file_path, 'rows': rows}
     
     # ========== 报告生成 ==========
     
-    def generate_report(self) -> str:
-        """生成CRM报告"""
+    def _cached_section(self, name: str, kinds: tuple, render, *params) -> str:
+        """段落缓存: 依赖集合的数据版本与参数都未变时复用上次生成的文本"""
+        key = tuple(self.data_version[k] for k in kinds) + params
+        cached = self._report_cache.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+        text = render(*params)
+        self._report_cache[name] = (key, text)
+        return text
+    
+    def _section_overview(self) -> str:
         stats = self.get_statistics()
-        pipeline = self.get_pipeline()
-        source_stats = self.get_source_stats()
-        
-        report = f"""# 📊 CRM客户管理报告
-
-**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
----
-
-## 📈 总体统计
+        return f"""## 📈 总体统计
 
 | 指标 | 数值 |
 |------|------|
@@ -510,47 +840,46 @@ class CRMSystem:
 | 已筛选 | {stats['customers']['qualified']} |
 | 已成交 | {stats['customers']['closed_won']} |
 | 已流失 | {stats['customers']['closed_lost']} |
-
----
-
-## 🎯 意向分布
+"""
+    
+    def _section_intent(self) -> str:
+        stats = self.get_statistics()
+        return f"""## 🎯 意向分布
 
 | 等级 | 数量 | 占比 |
 |------|------|------|
 | 高意向 | {stats['intent']['high']} | {stats['intent']['high']/stats['customers']['total']*100 if stats['customers']['total']>0 else 0:.1f}% |
 | 中意向 | {stats['intent']['medium']} | {stats['intent']['medium']/stats['customers']['total']*100 if stats['customers']['total']>0 else 0:.1f}% |
 | 低意向 | {stats['intent']['low']} | {stats['intent']['low']/stats['customers']['total']*100 if stats['customers']['total']>0 else 0:.1f}% |
-
----
-
-## 🔄 销售漏斗
+"""
+    
+    def _section_pipeline(self) -> str:
+        pipeline = self.get_pipeline()
+        text = """## 🔄 销售漏斗
 
 | 阶段 | 数量 | 转化率 |
 |------|------|--------|
 """
-        
-        prev_count = stats['customers']['total']
+        prev_count = self.stats.customer_total
         for stage, count in pipeline.items():
             rate = round(count / prev_count * 100, 1) if prev_count > 0 else 0
-            report += f"| {stage} | {count} | {rate}% |\n"
+            text += f"| {stage} | {count} | {rate}% |\n"
             prev_count = count if count > 0 else prev_count
-        
-        report += f"""
----
-
-## 📊 来源分析
+        return text
+    
+    def _section_sources(self) -> str:
+        text = """## 📊 来源分析
 
 | 来源 | 总数 | 成交 | 转化率 |
 |------|------|------|--------|
 """
-        
-        for source, data in sorted(source_stats.items(), key=lambda x: x[1]['total'], reverse=True):
-            report += f"| {source} | {data['total']} | {data['won']} | {data['rate']}% |\n"
-        
-        report += f"""
----
-
-## 💰 成交统计
+        for source, data in sorted(self.get_source_stats().items(), key=lambda x: x[1]['total'], reverse=True):
+            text += f"| {source} | {data['total']} | {data['won']} | {data['rate']}% |\n"
+        return text
+    
+    def _section_deals(self) -> str:
+        stats = self.get_statistics()
+        return f"""## 💰 成交统计
 
 | 指标 | 数值 |
 |------|------|
@@ -558,23 +887,48 @@ class CRMSystem:
 | 总放款金额 | ¥{stats['deals']['total_amount']:,.0f} |
 | 总佣金 | ¥{stats['deals']['total_commission']:,.0f} |
 | 平均佣金 | ¥{stats['deals']['avg_commission']:,.0f} |
-
----
-
-## 📋 今日待跟进
+"""
+    
+    def _section_pending(self, today: str) -> str:
+        text = """## 📋 今日待跟进
 
 | 客户 | 计划时间 | 状态 |
 |------|----------|------|
 """
-        
-        pending = self.get_pending_followups()
-        for customer, time in pending[:10]:
-            report += f"| {customer.name} | {time} | {customer.status} |\n"
-        
-        report += f"""
----
+        for customer, when in self.get_pending_followups()[:10]:
+            text += f"| {customer.name} | {format_date(when)} | {customer.status} |\n"
+        return text
+    
+    def _section_period(self, period: str, today: str) -> str:
+        """时间窗口概览，由每日汇总计算"""
+        label, days = REPORT_PERIODS[period]
+        start = day_to_str(str_to_day(today) - days + 1)
+        rollups = self.get_rollups()
+        total = rollups.totals(start, today)
+        text = f"""## 📅 {label}概览 ({start} ~ {today})
 
-## 💡 优化建议
+| 指标 | 数值 |
+|------|------|
+| 新增客户 | {total['new_customers']} |
+| 跟进次数 | {total['followups']} |
+| 成交客户 | {total['won']} |
+| 成交笔数 | {total['deals']} |
+| 放款金额 | ¥{total['deal_amount']:,.0f} |
+| 佣金 | ¥{total['deal_commission']:,.0f} |
+"""
+        if days > 1:
+            text += """
+| 日期 | 新增客户 | 跟进 | 成交 | 放款金额 |
+|------|----------|------|------|----------|
+"""
+            for day, counts in rollups.series(start, today):
+                text += (f"| {day} | {counts['new_customers']} | {counts['followups']} | "
+                         f"{counts['won']} | ¥{counts['deal_amount']:,.0f} |\n")
+        return text
+    
+    @staticmethod
+    def _section_tips() -> str:
+        return """## 💡 优化建议
 
 ### 提升转化率
 1. 跟进频率: 保证每周至少跟进1次
@@ -585,16 +939,39 @@ class CRMSystem:
 1. 原因分析: 记录每次流失原因
 2. 定期回访: 流失客户定期回访
 3. 差异化服务: 针对不同意向等级提供不同服务
-
----
-
-*报告由 CRM System 自动生成*
 """
+    
+    def generate_report(self, period: str = "") -> str:
+        """生成CRM报告
+        
+        各段落按依赖集合的数据版本缓存，数据未变的段落直接复用；
+        period为 daily/weekly/monthly 时加入该时间窗口的概览（由每日汇总计算）。
+        """
+        if period and period not in REPORT_PERIODS:
+            raise ValueError(f"Unknown report period: {period} (available: {', '.join(REPORT_PERIODS)})")
+        self._require('customers', 'deals')
+        today = day_to_str(today_day())
+        
+        sections = []
+        if period:
+            sections.append(self._cached_section(f'period_{period}', COLLECTIONS, self._section_period, period, today))
+        sections += [
+            self._cached_section('overview', ('customers',), self._section_overview),
+            self._cached_section('intent', ('customers',), self._section_intent),
+            self._cached_section('pipeline', ('customers',), self._section_pipeline),
+            self._cached_section('sources', ('customers',), self._section_sources),
+            self._cached_section('deals', ('deals',), self._section_deals),
+            self._cached_section('pending', ('customers',), self._section_pending, today),
+            self._section_tips(),
+        ]
         
-        return report
+        title = f"CRM客户管理{REPORT_PERIODS[period][0]}" if period else "CRM客户管理报告"
+        return (f"# 📊 {title}\n\n**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n---\n\n"
+                + "\n---\n\n".join(sections)
+                + "\n---\n\n*报告由 CRM System 自动生成*\n")
     
-    def run_full_report(self):
-        """执行完整报告"""
+    def run_full_report(self, period: str = ""):
+        """执行完整报告（period: daily/weekly/monthly）"""
         print("=" * 60)
         print("    📊 CRM客户管理系统 v1.0")
         print("=" * 60)
@@ -615,8 +992,9 @@ class CRMSystem:
         print(f"\n⏰ 待跟进: {len(pending)} 个")
         
         # 生成报告
-        report = self.generate_report()
-        report_file = DATA_DIR / f"crm_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+        report = self.generate_report(period)
+        suffix = f"{period}_" if period else ""
+        report_file = DATA_DIR / f"crm_report_{suffix}{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
         report_file.write_text(report, encoding='utf-8')
         
         # 导出数据
@@ -632,6 +1010,26 @@ class CRMSystem:
         return stats, report_file
 
 
+def migrate_storage(source: str, target: str = "") -> Dict[str, int]:
+    """在存储后端之间迁移全部数据
+    
+    target为空或与source相同时原地重写，把旧格式(如字符串时间)转换为当前格式
+    """
+    target = target or source
+    src = create_storage(source, DATA_DIR, MODELS)
+    dst = create_storage(target, DATA_DIR, MODELS)
+    counts = {}
+    for kind in COLLECTIONS:
+        model = MODELS[kind]
+        records = [model(**r) for r in src.load(kind)]
+        dst.replace_all(kind, records)
+        counts[kind] = len(records)
+    src.close()
+    dst.close()
+    logger.info(f"Migrated {counts} from {source} to {target}")
+    return counts
+
+
 def main():
     crm = CRMSystem()
     stats, report_file = crm.run_full_report()
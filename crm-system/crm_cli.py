@@ -2,15 +2,34 @@
 """
 CRM命令行工具
 快速执行CRM操作
+
+常驻服务(crm_server.py)运行时命令转发给服务执行，否则在本进程内加载数据执行。
+转发路径不导入crm模块，启动开销只有解释器本身。
 """
 
+import os
 import sys
 import json
+import socket
 from pathlib import Path
-from datetime import datetime
-from crm import CRMSystem, CustomerStatus, IntentLevel
+from typing import Dict, List, Optional
+
+from timestamps import format_date, format_ts
+
+DATA_DIR = Path(os.environ.get("CRM_DATA_DIR", "/home/codespace/clawd/crm-system/data"))
+SOCKET_PATH = DATA_DIR / "crm.sock"
+
+# 连接常驻服务的超时(秒)，连不上时退回本地执行
+CONNECT_TIMEOUT = 1.0
+
+# 只在本地执行的命令（直接操作存储文件）
+LOCAL_COMMANDS = {'migrate'}
+
+# 位置参数为输入文件路径的命令（相对路径按调用方当前目录解析，发给常驻服务前转为绝对路径）
+PATH_COMMANDS = {'import'}
 
-DATA_DIR = Path("/home/codespace/clawd/crm-system/data")
+# 常驻服务中共享的CRMSystem
+_shared_crm = None
 
 
 def print_help():
@@ -25,26 +44,109 @@ CRM命令行工具
   get <客户ID>                  查看客户详情
   update <客户ID> <字段>=<值>   更新客户
   delete <客户ID>               删除客户
-  search <关键词>               搜索客户
+  search <关键词> [选项]        搜索客户 (按相关度排序)
+                                --status= --intent= --source= --page= --size=
   follow <客户ID> <方式> <内容>  添加跟进记录
-  pending                       待跟进客户
-  import <文件>                 从搜索结果导入
+  pending [--window=天数]       待跟进客户 (默认今日到期)
+  import <文件/目录...>         从搜索结果导入 (目录导入其中所有leads_*.json)
+                                --name-dedup=off 关闭按姓名去重
   stats                         统计数据
-  report                        生成报告
-  export                        导出CSV
+  report [--period=周期]        生成报告 (daily/weekly/monthly 附带时间窗口概览)
+  export [文件] [选项]           导出客户 (默认customers.csv；.jsonl为JSON Lines，再加.gz压缩)
+                                --status= --intent= --source= --since=日期 --until=日期
+                                --columns=id,name,phone,followup_count,deal_amount,...
+                                --changed 只导出上次导出以来更新过的客户
   pipeline                      销售漏斗
+  trend [指标] [选项]           趋势 (new_customers/won/followups/deals/deal_amount/deal_commission/conversion)
+                                --by=status|source|intent|product --interval=day|week|month
+                                --days=30 --since=日期 --until=日期
+  dedup [选项]                  查找重复客户 (按电话/微信/姓名+来源分块打分)
+                                --min-score=0.5 --limit=20 --auto 自动合并高分重复(默认≥0.8)
+  merge <保留ID> <重复ID...>    合并客户 (跟进与成交改挂到保留客户)
+  migrate <源后端> [目标后端]    迁移存储 (journal/json/sqlite)；只给一个后端时按当前格式原地重写
 
 示例:
   python crm_cli.py add 张三 13800138000 抖音
   python crm_cli.py update C123456 status=跟进中
   python crm_cli.py search 贷款
+  python crm_cli.py search 征信 装修 --intent=高意向 --page=2
   python crm_cli.py follow ABCD1234 电话 客户有意向
+  python crm_cli.py export leads.jsonl.gz --status=跟进中 --since=2025-01-01 --columns=id,name,phone,followup_count
+  python crm_cli.py trend conversion --by=source --interval=week --days=90
+  python crm_cli.py dedup --auto
+  python crm_cli.py migrate json sqlite
+
+存储后端通过环境变量 CRM_STORAGE 选择 (默认 journal)
+常驻服务: python crm_server.py start (运行时命令自动转发，CRM_SERVER=off 强制本地执行)
 """)
 
 
+def use_crm(crm):
+    """常驻服务注入共享的CRMSystem"""
+    global _shared_crm
+    _shared_crm = crm
+
+
+def get_crm():
+    """常驻服务内复用同一个CRMSystem，否则新建"""
+    if _shared_crm is not None:
+        return _shared_crm
+    from crm import CRMSystem
+    return CRMSystem()
+
+
+def absolute_path_args(command: str, args: List[str]) -> List[str]:
+    """当前目录下存在的路径参数转为绝对路径；其余参数原样保留（服务端再按数据目录解析）"""
+    if command not in PATH_COMMANDS:
+        return args
+    return [arg if arg.startswith('--') or not Path(arg).exists() else str(Path(arg).resolve())
+            for arg in args]
+
+
+def request_server(command: str, args: List[str]) -> Optional[Dict]:
+    """把命令发给常驻服务，返回 {output, code}；服务未运行或不接受该请求时返回None"""
+    if os.environ.get("CRM_SERVER") == "off" or not SOCKET_PATH.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(SOCKET_PATH))
+        except OSError:
+            return None  # 服务已退出，残留的socket文件
+        # 已连接后不再超时: 命令可能已在服务端执行，不能退回本地重复执行
+        sock.settimeout(None)
+        request = {'command': command, 'args': absolute_path_args(command, args), 'storage': os.environ.get("CRM_STORAGE", "")}
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    response = json.loads(b"".join(chunks))
+    return None if response.get('fallback') else response
+
+
+def parse_options(args):
+    """拆分位置参数与 --key=value 选项（不带值的 --flag 记为 on）"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--') and '=' in arg:
+            key, value = arg[2:].split('=', 1)
+            options[key] = value
+        elif arg.startswith('--') and len(arg) > 2:
+            options[arg[2:]] = 'on'
+        else:
+            positional.append(arg)
+    return positional, options
+
+
 def cmd_list(args):
     """列出客户"""
-    crm = CRMSystem()
+    crm = get_crm()
     
     status = args[0] if args else ""
     intent = args[1] if len(args) > 1 else ""
@@ -52,12 +154,12 @@ def cmd_list(args):
     customers = crm.search_customers(status=status, intent=intent)
     
     print(f"\n客户列表 ({len(customers)}个):")
-    print("-" * 80)
-    print(f"{'ID':<10} {'姓名':<10} {'电话':<15} {'状态':<10} {'意向':<8} {'产品':<15}")
-    print("-" * 80)
+    print("-" * 88)
+    print(f"{'ID':<18} {'姓名':<10} {'电话':<15} {'状态':<10} {'意向':<8} {'产品':<15}")
+    print("-" * 88)
     
     for c in customers:
-        print(f"{c.id:<10} {c.name:<10} {c.phone:<15} {c.status:<10} {c.intent_level:<8} {c.product_type[:15] if c.product_type else '-':<15}")
+        print(f"{c.id:<18} {c.name:<10} {c.phone:<15} {c.status:<10} {c.intent_level:<8} {c.product_type[:15] if c.product_type else '-':<15}")
 
 
 def cmd_add(args):
@@ -69,7 +171,7 @@ def cmd_add(args):
     name, phone = args[0], args[1]
     source = args[2] if len(args) > 2 else ""
     
-    crm = CRMSystem()
+    crm = get_crm()
     customer = crm.add_customer(name=name, phone=phone, source=source)
     print(f"✅ 添加成功: {customer.id}")
 
@@ -80,7 +182,7 @@ def cmd_get(args):
         print("❌ 需要提供客户ID")
         return
     
-    crm = CRMSystem()
+    crm = get_crm()
     customer = crm.get_customer(args[0])
     
     if not customer:
@@ -97,15 +199,15 @@ def cmd_get(args):
     print(f"  产品: {customer.product_type}")
     print(f"  金额: ¥{customer.amount:,.0f}" if customer.amount else "  金额: -")
     print(f"  描述: {customer.description}")
-    print(f"  创建: {customer.created_at}")
-    print(f"  最后联系: {customer.last_contact}")
+    print(f"  创建: {format_ts(customer.created_at)}")
+    print(f"  最后联系: {format_ts(customer.last_contact)}")
     
     # 跟进记录
     followups = crm.get_customer_followups(customer.id)
     if followups:
         print(f"\n跟进记录 ({len(followups)}条):")
         for f in followups[-5:]:
-            print(f"  - [{f.type}] {f.content[:30]}... ({f.created_at})")
+            print(f"  - [{f.type}] {f.content[:30]}... ({format_ts(f.created_at)})")
 
 
 def cmd_update(args):
@@ -122,8 +224,13 @@ def cmd_update(args):
             key, value = arg.split('=', 1)
             update_data[key] = value
     
-    crm = CRMSystem()
-    if crm.update_customer(customer_id, **update_data):
+    crm = get_crm()
+    try:
+        updated = crm.update_customer(customer_id, **update_data)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    if updated:
         print(f"✅ 更新成功")
     else:
         print("❌ 客户不存在")
@@ -131,15 +238,23 @@ def cmd_update(args):
 
 def cmd_search(args):
     """搜索客户"""
+    args, options = parse_options(args)
     if not args:
         print("❌ 需要提供关键词")
         return
     
-    keyword = args[0]
-    crm = CRMSystem()
-    customers = crm.search_customers(keyword=keyword)
+    keyword = ' '.join(args)
+    page = max(int(options.get('page', 1)), 1)
+    size = int(options.get('size', 20))
+    
+    crm = get_crm()
+    matched = crm.search_customers(keyword=keyword,
+                                   status=options.get('status', ''),
+                                   intent=options.get('intent', ''),
+                                   source=options.get('source', ''))
+    customers = matched[(page - 1) * size:page * size]
     
-    print(f"\n搜索结果 '{keyword}' ({len(customers)}个):")
+    print(f"\n搜索结果 '{keyword}' ({len(matched)}个, 第{page}页):")
     print("-" * 80)
     for c in customers:
         print(f"  {c.id} | {c.name} | {c.phone} | {c.status} | {c.intent_level}")
@@ -153,36 +268,46 @@ def cmd_follow(args):
     
     customer_id, type_, content = args[0], args[1], args[2]
     
-    crm = CRMSystem()
+    crm = get_crm()
     followup = crm.add_followup(customer_id, type_, content)
     print(f"✅ 跟进记录已添加: {followup.id}")
 
 
 def cmd_pending(args):
     """待跟进"""
-    crm = CRMSystem()
-    pending = crm.get_pending_followups()
+    args, options = parse_options(args)
+    days = int(options.get('window', 0))
+    
+    crm = get_crm()
+    pending = crm.get_pending_followups(days=days)
     
-    print(f"\n待跟进客户 ({len(pending)}个):")
+    scope = f"{days}天内" if days else "今日"
+    print(f"\n{scope}待跟进客户 ({len(pending)}个):")
     print("-" * 60)
-    for customer, time in pending:
-        print(f"  {customer.name} | {customer.phone} | {customer.status} | 计划: {time}")
+    for customer, when in pending:
+        print(f"  {customer.name} | {customer.phone} | {customer.status} | 计划: {format_date(when)}")
 
 
 def cmd_import(args):
     """导入客户"""
+    args, options = parse_options(args)
     if not args:
-        print("❌ 需要提供文件")
+        print("❌ 需要提供文件或目录")
         return
     
-    crm = CRMSystem()
-    count = crm.import_from_search(args[0])
-    print(f"✅ 成功导入 {count} 个客户")
+    crm = get_crm()
+    try:
+        counts = crm.import_leads(args, dedup_name=options.get('name-dedup', 'on') != 'off')
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"✅ 导入完成 ({counts['files']}个文件): 新增 {counts['inserted']} | "
+          f"合并 {counts['merged']} | 跳过 {counts['skipped']} | 无效 {counts['invalid']}")
 
 
 def cmd_stats(args):
     """统计"""
-    crm = CRMSystem()
+    crm = get_crm()
     stats = crm.get_statistics()
     
     print("\n📊 统计数据:")
@@ -196,21 +321,40 @@ def cmd_stats(args):
 
 def cmd_report(args):
     """生成报告"""
-    crm = CRMSystem()
-    stats, report_file = crm.run_full_report()
+    args, options = parse_options(args)
+    crm = get_crm()
+    try:
+        stats, report_file = crm.run_full_report(period=options.get('period', ''))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     print(f"\n✅ 报告已生成: {report_file}")
 
 
 def cmd_export(args):
     """导出"""
-    crm = CRMSystem()
-    csv_file = crm.export_to_csv()
-    print(f"✅ 数据已导出: {csv_file}")
+    args, options = parse_options(args)
+    filename = args[0] if args else "customers.csv"
+    columns = options['columns'].split(',') if options.get('columns') else None
+    
+    crm = get_crm()
+    try:
+        result = crm.export_customers(filename, columns=columns,
+                                      status=options.get('status', ''),
+                                      intent=options.get('intent', ''),
+                                      source=options.get('source', ''),
+                                      since=options.get('since', ''),
+                                      until=options.get('until', ''),
+                                      incremental=options.get('changed') == 'on')
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"✅ 数据已导出: {result['path']} ({result['rows']}条)")
 
 
 def cmd_pipeline(args):
     """销售漏斗"""
-    crm = CRMSystem()
+    crm = get_crm()
     pipeline = crm.get_pipeline()
     
     print("\n🔄 销售漏斗:")
@@ -220,6 +364,123 @@ def cmd_pipeline(args):
         print(f"  {stage:<10} {count:<5} {bar}")
 
 
+def cmd_trend(args):
+    """趋势"""
+    args, options = parse_options(args)
+    metric = args[0] if args else "new_customers"
+    by = options.get('by', '')
+    
+    crm = get_crm()
+    try:
+        trend = crm.get_trend(metric, by=by,
+                              interval=options.get('interval', 'day'),
+                              since=options.get('since', ''),
+                              until=options.get('until', ''),
+                              days=int(options.get('days', 30)))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    unit = "%" if metric == 'conversion' else ""
+    print(f"\n📈 趋势: {metric}" + (f" 按{by}" if by else ""))
+    print("-" * 60)
+    if not by:
+        peak = max((values.get('', 0) for _, values in trend), default=0)
+        for label, values in trend:
+            value = values.get('', 0)
+            bar = "█" * int(value / peak * 30) if peak > 0 else ""
+            print(f"  {label:<10} {value:>10,.{1 if unit else 0}f}{unit} {bar}")
+        return
+    
+    # 按维度拆分: 列为合计最大的前8个取值
+    totals = {}
+    for _, values in trend:
+        for key, value in values.items():
+            totals[key] = totals.get(key, 0) + value
+    keys = sorted(totals, key=totals.get, reverse=True)[:8]
+    print(f"  {'时间':<10} " + " ".join(f"{k[:6]:>8}" for k in keys))
+    for label, values in trend:
+        print(f"  {label:<10} " + " ".join(f"{values.get(k, 0):>8,.{1 if unit else 0}f}" for k in keys))
+
+
+def cmd_dedup(args):
+    """查找/自动合并重复客户"""
+    from dedup import AUTO_MERGE_SCORE, MIN_SCORE
+    args, options = parse_options(args)
+    crm = get_crm()
+    
+    if options.get('auto') == 'on':
+        counts = crm.dedup_customers(float(options.get('min-score', AUTO_MERGE_SCORE)))
+        print(f"✅ 合并完成: {counts['merged']}个重复客户并入{counts['groups']}个客户 "
+              f"(跟进{counts['followups']}条, 成交{counts['deals']}条)")
+        return
+    
+    candidates = crm.find_duplicates(float(options.get('min-score', MIN_SCORE)))
+    limit = int(options.get('limit', 20))
+    print(f"\n疑似重复客户 ({len(candidates)}对):")
+    print("-" * 80)
+    for m in candidates[:limit]:
+        print(f"  {m.score:.2f} | {m.keep.id} {m.keep.name} {m.keep.phone or '-'} <- "
+              f"{m.duplicate.id} {m.duplicate.name} {m.duplicate.phone or '-'} | {', '.join(m.reasons)}")
+    if len(candidates) > limit:
+        print(f"  ... 还有{len(candidates) - limit}对，--limit= 查看更多")
+
+
+def cmd_merge(args):
+    """合并客户"""
+    if len(args) < 2:
+        print("❌ 需要提供保留客户ID和至少一个重复客户ID")
+        return
+    
+    crm = get_crm()
+    try:
+        counts = crm.merge_customers(args[0], args[1:])
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"✅ 已合并{counts['merged']}个客户到 {args[0]} (跟进{counts['followups']}条, 成交{counts['deals']}条)")
+
+
+def cmd_migrate(args):
+    """迁移存储后端"""
+    if not args:
+        print("❌ 需要提供源后端和目标后端 (journal/json/sqlite)")
+        return
+    
+    source = args[0]
+    target = args[1] if len(args) > 1 else source
+    from crm import migrate_storage
+    try:
+        counts = migrate_storage(source, target)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    print(f"✅ 迁移完成: {source} -> {target}")
+    for kind, count in counts.items():
+        print(f"  {kind}: {count}")
+
+
+COMMANDS = {
+    'list': cmd_list,
+    'add': cmd_add,
+    'get': cmd_get,
+    'update': cmd_update,
+    'search': cmd_search,
+    'follow': cmd_follow,
+    'pending': cmd_pending,
+    'import': cmd_import,
+    'stats': cmd_stats,
+    'report': cmd_report,
+    'export': cmd_export,
+    'pipeline': cmd_pipeline,
+    'trend': cmd_trend,
+    'dedup': cmd_dedup,
+    'merge': cmd_merge,
+    'migrate': cmd_migrate,
+}
+
+
 def main():
     if len(sys.argv) < 2:
         print_help()
@@ -228,23 +489,19 @@ def main():
     command = sys.argv[1]
     args = sys.argv[2:]
     
-    commands = {
-        'list': cmd_list,
-        'add': cmd_add,
-        'get': cmd_get,
-        'update': cmd_update,
-        'search': cmd_search,
-        'follow': cmd_follow,
-        'pending': cmd_pending,
-        'import': cmd_import,
-        'stats': cmd_stats,
-        'report': cmd_report,
-        'export': cmd_export,
-        'pipeline': cmd_pipeline,
-    }
-    
-    if command in commands:
-        commands[command](args)
+    if command in COMMANDS:
+        if command not in LOCAL_COMMANDS:
+            response = request_server(command, args)
+            if response is not None:
+                sys.stdout.write(response['output'])
+                sys.exit(response['code'])
+        
+        from crm import ConflictError
+        try:
+            COMMANDS[command](args)
+        except ConflictError as e:
+            print(f"❌ 数据已被其他进程修改，请重试 ({e})")
+            sys.exit(1)
     else:
         print(f"❌ 未知命令: {command}")
         print_help()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+CRM常驻服务
+asyncio + Unix socket，CRMSystem及其索引常驻内存，crm_cli.py检测到服务后自动转发命令
+
+协议: 每个连接一个请求，客户端发送一行JSON {command, args, storage}，
+服务端返回 {output, code}（命令的标准输出与退出码）后关闭连接；
+{fallback: true} 表示服务不处理该请求，客户端改为本地执行。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import crm_cli
+from crm import CRMSystem, ConflictError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CRMServer:
+    """CRM常驻服务"""
+
+    def __init__(self, socket_path: Path, backend: str = ""):
+        self.socket_path = Path(socket_path)
+        self.crm = CRMSystem(backend)
+        self.stamp = None
+        self.started = time.time()
+        self.requests = 0
+        self._stop = None
+
+    def warm_up(self):
+        """预加载全部数据与索引"""
+        start = time.perf_counter()
+        self.crm.load_data()
+        self.crm.search_customers(keyword=" ")  # 不会命中，只为建立检索索引
+        self.stamp = self.crm.storage.stamp()
+        crm_cli.use_crm(self.crm)
+        logger.info(f"CRM server warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _sync(self):
+        """数据被其他进程(定时任务、导入脚本)写过时重新加载"""
+        if self.crm.storage.stamp() != self.stamp:
+            logger.info("Data changed by another process, reloading")
+            self.crm.load_data()
+
+    def status(self) -> str:
+        return (f"🟢 CRM服务运行中 pid={os.getpid()} 后端={self.crm.storage.name} "
+                f"客户={len(self.crm.customers)} 请求={self.requests} "
+                f"运行={int(time.time() - self.started)}s\n")
+
+    def execute(self, request: Dict) -> Dict:
+        """执行一个请求"""
+        command = request.get('command', '')
+        storage = request.get('storage') or self.crm.storage.name
+        if command == 'status':
+            return {'output': self.status(), 'code': 0}
+        if command == 'shutdown':
+            self._stop.set()
+            return {'output': "✅ CRM服务已停止\n", 'code': 0}
+        if (command not in crm_cli.COMMANDS or command in crm_cli.LOCAL_COMMANDS
+                or storage != self.crm.storage.name):
+            return {'fallback': True}
+
+        self.requests += 1
+        self._sync()
+        output = io.StringIO()
+        code = 0
+        with contextlib.redirect_stdout(output):
+            try:
+                crm_cli.COMMANDS[command](list(request.get('args', [])))
+            except ConflictError as e:
+                print(f"❌ 数据已被其他进程修改，请重试 ({e})")
+                self.crm.load_data()
+                code = 1
+            except Exception as e:
+                logger.exception(f"Command failed: {command}")
+                print(f"❌ 执行失败: {e}")
+                code = 1
+        self.stamp = self.crm.storage.stamp()
+        return {'output': output.getvalue(), 'code': code}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+            try:
+                response = self.execute(json.loads(line))
+            except json.JSONDecodeError:
+                response = {'output': "❌ 无效请求\n", 'code': 1}
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if self.socket_path.exists():
+            if crm_cli.request_server('status', []) is not None:
+                raise RuntimeError(f"CRM server already running at {self.socket_path}")
+            self.socket_path.unlink()  # 上次异常退出残留
+
+        self._stop = asyncio.Event()
+        self.warm_up()
+        server = await asyncio.start_unix_server(self.handle, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop.set)
+        logger.info(f"CRM server listening on {self.socket_path}")
+
+        try:
+            async with server:
+                await self._stop.wait()
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            self.crm.flush()
+            self.crm.storage.close()
+            logger.info("CRM server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRM常驻服务")
+    parser.add_argument('action', nargs='?', default='start', choices=['start', 'stop', 'status'],
+                        help="start: 前台运行服务; stop: 停止; status: 查看状态")
+    args = parser.parse_args()
+
+    if args.action == 'start':
+        try:
+            asyncio.run(CRMServer(crm_cli.SOCKET_PATH).serve())
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+
+    response = crm_cli.request_server('shutdown' if args.action == 'stop' else 'status', [])
+    if response is None:
+        print("⚪ CRM服务未运行")
+        sys.exit(1)
+    sys.stdout.write(response['output'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+客户去重与合并
+按分块键(电话、微信、规范化姓名+来源)分组，只对同块内的客户两两打分，整体近似线性
+"""
+
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, List, Set, Tuple
+import logging
+
+from importer import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# 单个分块的客户数上限，超过时(如"客户"、"王先生"这类通用称呼)视为无区分度，跳过该块
+MAX_BLOCK_SIZE = 20
+
+# 列出合并候选的最低分
+MIN_SCORE = 0.5
+
+# 自动合并的最低分
+AUTO_MERGE_SCORE = 0.8
+
+# 打分权重: 证据 -> 分值（电话/微信不一致时扣分）
+WEIGHTS = {
+    'phone': 0.6,
+    'phone_conflict': -0.5,
+    'wechat': 0.5,
+    'wechat_conflict': -0.2,
+    'name': 0.35,
+    'source': 0.1,
+    'description': 0.35,
+}
+
+# 合并时空值由重复记录补全的字段
+FILL_FIELDS = ('phone', 'wechat', 'source', 'product_type', 'amount', 'term', 'description',
+               'credit_issue_desc', 'property_value', 'property_loan', 'lost_reason')
+
+_NON_DIGIT = re.compile(r"\D+")
+
+
+def normalize_phone(phone: str) -> str:
+    """只保留数字，去掉+86/86前缀"""
+    digits = _NON_DIGIT.sub('', phone or '')
+    if len(digits) == 13 and digits.startswith('86'):
+        digits = digits[2:]
+    return digits
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass
+class MergeCandidate:
+    """疑似重复的一对客户"""
+    keep: object                # 保留的客户（较早录入）
+    duplicate: object           # 合并进keep的客户
+    score: float
+    reasons: List[str] = field(default_factory=list)
+
+
+class CustomerDeduplicator:
+    """客户去重器"""
+
+    def __init__(self, crm, status_order: Tuple[str, ...], intent_order: Tuple[str, ...]):
+        self.crm = crm
+        self.status_order = {s: i for i, s in enumerate(status_order)}  # 越靠后越优先保留
+        self.intent_order = {s: i for i, s in enumerate(intent_order)}
+        self.skipped_blocks = 0
+
+    # ========== 分块与打分 ==========
+
+    @staticmethod
+    def profile(customer) -> Tuple[str, str, str]:
+        """分块与打分用的规范化字段: (电话, 微信, 姓名)，每个客户只算一次"""
+        return (normalize_phone(customer.phone), (customer.wechat or '').strip().lower(),
+                normalize_name(customer.name))
+
+    def candidate_pairs(self, customers: List, profiles: List[Tuple]) -> Set[Tuple[int, int]]:
+        """同块内的客户对(按列表下标)，一对客户只出现一次"""
+        blocks: Dict[str, List[int]] = {}
+        for i, (customer, (phone, wechat, name)) in enumerate(zip(customers, profiles)):
+            if phone:
+                blocks.setdefault(f"phone:{phone}", []).append(i)
+            if wechat:
+                blocks.setdefault(f"wechat:{wechat}", []).append(i)
+            if name:
+                blocks.setdefault(f"name:{name}|{customer.source}", []).append(i)
+
+        pairs = set()
+        self.skipped_blocks = 0
+        for key, members in blocks.items():
+            if len(members) < 2:
+                continue
+            if len(members) > MAX_BLOCK_SIZE:
+                self.skipped_blocks += 1
+                logger.debug(f"Skipped dedup block {key} ({len(members)} customers)")
+                continue
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+        return pairs
+
+    def score(self, a, b) -> Tuple[float, List[str]]:
+        """两个客户是同一人的得分(0~1)及依据"""
+        return self._score(a, b, self.profile(a), self.profile(b))
+
+    @staticmethod
+    def _score(a, b, pa: Tuple, pb: Tuple) -> Tuple[float, List[str]]:
+        score, reasons = 0.0, []
+        phone_a, wechat_a, name_a = pa
+        phone_b, wechat_b, name_b = pb
+        if phone_a and phone_b:
+            if phone_a == phone_b:
+                score += WEIGHTS['phone']
+                reasons.append("电话相同")
+            else:
+                score += WEIGHTS['phone_conflict']
+                reasons.append("电话不同")
+        if wechat_a and wechat_b:
+            if wechat_a == wechat_b:
+                score += WEIGHTS['wechat']
+                reasons.append("微信相同")
+            else:
+                score += WEIGHTS['wechat_conflict']
+        if name_a and name_b:
+            similarity = 1.0 if name_a == name_b else SequenceMatcher(None, name_a, name_b).ratio()
+            score += WEIGHTS['name'] * similarity
+            if similarity == 1:
+                reasons.append("姓名相同")
+            elif similarity >= 0.5:
+                reasons.append(f"姓名相似{similarity:.0%}")
+        if a.source and a.source == b.source:
+            score += WEIGHTS['source']
+            reasons.append("来源相同")
+        words_a, words_b = _bigrams(normalize_name(a.description)), _bigrams(normalize_name(b.description))
+        if words_a and words_b:
+            similarity = len(words_a & words_b) / len(words_a | words_b)
+            score += WEIGHTS['description'] * similarity
+            if similarity >= 0.5:
+                reasons.append(f"描述相似{similarity:.0%}")
+        return round(min(max(score, 0.0), 1.0), 3), reasons
+
+    def find_candidates(self, customers: List, min_score: float = MIN_SCORE) -> List[MergeCandidate]:
+        """疑似重复的客户对，按得分从高到低"""
+        profiles = [self.profile(c) for c in customers]
+        candidates = []
+        for i, j in self.candidate_pairs(customers, profiles):
+            a, b = customers[i], customers[j]
+            score, reasons = self._score(a, b, profiles[i], profiles[j])
+            if score < min_score:
+                continue
+            keep, duplicate = sorted((a, b), key=lambda c: (c.created_at, c.id))
+            candidates.append(MergeCandidate(keep, duplicate, score, reasons))
+        candidates.sort(key=lambda m: (-m.score, m.keep.id, m.duplicate.id))
+        return candidates
+
+    # ========== 合并 ==========
+
+    @staticmethod
+    def group(candidates: List[MergeCandidate]) -> List[List]:
+        """候选对按连通关系分组，每组按录入先后排序(第一个为保留记录)；
+        不会把电话不同的客户并入同一组"""
+        parent: Dict[str, str] = {}
+        phones: Dict[str, Set[str]] = {}
+        members: Dict[str, object] = {}
+
+        def find(x: str) -> str:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for m in candidates:
+            for c in (m.keep, m.duplicate):
+                if c.id not in parent:
+                    parent[c.id] = c.id
+                    members[c.id] = c
+                    phone = normalize_phone(c.phone)
+                    phones[c.id] = {phone} if phone else set()
+            a, b = find(m.keep.id), find(m.duplicate.id)
+            if a == b or len(phones[a] | phones[b]) > 1:
+                continue
+            parent[b] = a
+            phones[a] |= phones.pop(b)
+
+        groups: Dict[str, List] = {}
+        for customer_id, customer in members.items():
+            groups.setdefault(find(customer_id), []).append(customer)
+        return [sorted(g, key=lambda c: (c.created_at, c.id)) for g in groups.values() if len(g) > 1]
+
+    def merged_fields(self, keep, duplicates: List) -> Dict:
+        """合并后保留记录需要更新的字段"""
+        records = [keep] + duplicates
+        updates = {}
+        for name in FILL_FIELDS:
+            if not getattr(keep, name):
+                value = next((getattr(d, name) for d in duplicates if getattr(d, name)), None)
+                if value:
+                    updates[name] = value
+
+        tags = list(dict.fromkeys(t for r in records for t in r.tags))
+        if tags != keep.tags:
+            updates['tags'] = tags
+        for flag in ('has_credit_issue', 'has_property'):
+            if not getattr(keep, flag) and any(getattr(d, flag) for d in duplicates):
+                updates[flag] = True
+
+        status = max((r.status for r in records), key=lambda s: self.status_order.get(s, -1))
+        if status != keep.status:
+            updates['status'] = status
+        intent = max((r.intent_level for r in records), key=lambda s: self.intent_order.get(s, -1))
+        if intent != keep.intent_level:
+            updates['intent_level'] = intent
+
+        earliest = self._pick(records, 'created_at', min)
+        if earliest != keep.created_at:
+            updates['created_at'] = earliest
+        for name, pick in (('last_contact', max), ('next_followup', min), ('converted_at', min)):
+            value = self._pick(records, name, pick)
+            if value != getattr(keep, name):
+                updates[name] = value
+        return updates
+
+    @staticmethod
+    def _pick(records: List, name: str, pick) -> int:
+        values = [getattr(r, name) for r in records if getattr(r, name)]
+        return pick(values) if values else 0
+
+    def run(self, min_score: float = AUTO_MERGE_SCORE) -> Dict[str, int]:
+        """自动合并得分不低于min_score的重复客户"""
+        groups = self.group(self.find_candidates(self.crm.customers, min_score))
+        counts = self.crm.merge_customer_groups([(g[0].id, [c.id for c in g[1:]]) for g in groups])
+        counts['groups'] = len(groups)
+        logger.info(f"Dedup merged {counts['merged']} customers into {counts['groups']} records")
+        return counts
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+客户数据导出
+逐条生成、逐行写出(CSV / JSON Lines，可gzip压缩)，支持过滤、选列与增量导出
+"""
+
+import csv
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from storage import atomic_write_text
+from timestamps import DATE_FORMAT, TIME_FORMAT, day_start, format_ts, parse_ts, str_to_day
+
+# 客户字段 -> 表头（未列出的Customer字段以字段名为表头）
+CUSTOMER_HEADERS = {
+    'id': 'ID',
+    'name': '姓名',
+    'phone': '电话',
+    'wechat': '微信',
+    'source': '来源',
+    'status': '状态',
+    'intent_level': '意向',
+    'product_type': '产品',
+    'amount': '金额',
+    'term': '期限',
+    'description': '描述',
+    'tags': '标签',
+    'created_at': '创建时间',
+    'updated_at': '更新时间',
+    'last_contact': '最后联系',
+    'next_followup': '下次跟进',
+    'converted_at': '成交日期',
+}
+
+# 跟进/成交汇总列 -> 表头
+AGGREGATE_HEADERS = {
+    'followup_count': '跟进次数',
+    'last_followup': '最近跟进',
+    'deal_count': '成交数',
+    'deal_amount': '放款金额',
+    'deal_commission': '佣金',
+}
+
+# 时间列(epoch秒)导出时格式化: 列名 -> 格式
+TIME_COLUMNS = {
+    'created_at': TIME_FORMAT,
+    'updated_at': TIME_FORMAT,
+    'last_contact': TIME_FORMAT,
+    'last_followup': TIME_FORMAT,
+    'next_followup': DATE_FORMAT,
+    'converted_at': DATE_FORMAT,
+}
+
+# 默认导出列（与旧版export_to_csv一致）
+DEFAULT_COLUMNS = ('id', 'name', 'phone', 'source', 'status', 'intent_level',
+                   'product_type', 'amount', 'created_at', 'last_contact')
+
+# 增量导出水位文件: {导出文件名: 上次导出开始时间}
+EXPORT_STATE_FILE = "export_state.json"
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path: Path) -> str:
+    """按扩展名判断格式: *.jsonl[.gz] 为JSON Lines，其余为CSV"""
+    suffixes = path.suffixes[-2:] if path.suffix == '.gz' else path.suffixes[-1:]
+    return 'jsonl' if '.jsonl' in suffixes else 'csv'
+
+
+def read_watermark(state_file: Path, key: str) -> int:
+    if not state_file.exists():
+        return 0
+    return parse_ts(json.loads(state_file.read_text(encoding='utf-8')).get(key))
+
+
+def write_watermark(state_file: Path, key: str, value: int):
+    state = json.loads(state_file.read_text(encoding='utf-8')) if state_file.exists() else {}
+    state[key] = value
+    atomic_write_text(state_file, json.dumps(state, ensure_ascii=False, indent=2))
+
+
+class CustomerExporter:
+    """客户导出器"""
+
+    def __init__(self, crm, columns: Optional[List[str]] = None,
+                 status: str = "", intent: str = "", source: str = "",
+                 since: str = "", until: str = "", changed_since: int = 0):
+        self.crm = crm
+        self.model = crm.storage.models['customers']
+        self.columns = list(columns or DEFAULT_COLUMNS)
+        unknown = [c for c in self.columns
+                   if c not in AGGREGATE_HEADERS and c not in self.model.__dataclass_fields__]
+        if unknown:
+            raise ValueError(f"Unknown export column(s): {', '.join(unknown)}")
+        self.status = status
+        self.intent = intent
+        self.source = source
+        # 创建日期范围 YYYY-MM-DD（含），转为epoch秒区间[since, until)
+        self.since = day_start(str_to_day(since)) if since else 0
+        self.until = day_start(str_to_day(until) + 1) if until else 0
+        self.changed_since = changed_since  # 只导出updated_at不早于该时间的客户
+        self._need_followups = any(c in self.columns for c in ('followup_count', 'last_followup'))
+        self._need_deals = any(c.startswith('deal_') for c in self.columns)
+
+    @property
+    def headers(self) -> List[str]:
+        return [CUSTOMER_HEADERS.get(c) or AGGREGATE_HEADERS.get(c) or c for c in self.columns]
+
+    def _matches(self, customer) -> bool:
+        if self.since and customer.created_at < self.since:
+            return False
+        if self.until and customer.created_at >= self.until:
+            return False
+        if self.changed_since and customer.updated_at < self.changed_since:
+            return False
+        return True
+
+    def iter_customers(self) -> Iterator:
+        """按条件逐个产出客户；行级存储未加载时用游标逐行读取"""
+        crm = self.crm
+        if crm._resident('customers'):
+            ids = crm.index.ids_with(status=self.status, source=self.source, intent=self.intent)
+            records = crm.customers if ids is None else (c for c in crm.customers if c.id in ids)
+        else:
+            crm._flush_kind('customers')
+            conditions = {k: v for k, v in (('status', self.status), ('intent_level', self.intent),
+                                            ('source', self.source)) if v}
+            records = (self.model(**r) for r in crm.storage.iter_rows('customers', **conditions))
+        return (c for c in records if self._matches(c))
+
+    def _aggregates(self, customer) -> Dict:
+        values = {}
+        if self._need_followups:
+            followups = self.crm.get_customer_followups(customer.id)
+            values['followup_count'] = len(followups)
+            values['last_followup'] = max((f.created_at for f in followups), default=0)
+        if self._need_deals:
+            deals = self.crm.get_customer_deals(customer.id)
+            values['deal_count'] = len(deals)
+            values['deal_amount'] = sum(d.amount for d in deals)
+            values['deal_commission'] = sum(d.commission for d in deals)
+        return values
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """逐行产出 {列名: 值}"""
+        time_columns = [(c, TIME_COLUMNS[c]) for c in self.columns if c in TIME_COLUMNS]
+        for customer in self.iter_customers():
+            aggregates = self._aggregates(customer) if self._need_followups or self._need_deals else {}
+            row = {c: aggregates[c] if c in aggregates else getattr(customer, c) for c in self.columns}
+            for column, fmt in time_columns:
+                row[column] = format_ts(row[column], fmt)
+            yield row
+
+    def write(self, path: Path, fmt: str = "") -> int:
+        """写出到文件（.gz结尾时gzip压缩），返回行数；写完整后才替换目标文件"""
+        path = Path(path)
+        fmt = fmt or detect_format(path)
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt} (available: {', '.join(FORMATS)})")
+        opener = gzip.open if path.suffix == '.gz' else open
+        tmp = path.with_name(f".{path.name}.tmp")
+        count = 0
+        try:
+            with opener(tmp, 'wt', encoding='utf-8', newline='') as f:
+                if fmt == 'csv':
+                    writer = csv.writer(f)
+                    writer.writerow(self.headers)
+                    for row in self.iter_rows():
+                        writer.writerow([','.join(v) if isinstance(v, list) else v for v in row.values()])
+                        count += 1
+                else:
+                    for row in self.iter_rows():
+                        f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                        count += 1
+            os.replace(tmp, path)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+        return count
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+线索批量导入
+流式读取JSON数组/JSON Lines，按电话与规范化姓名去重，整批一次落盘
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# 线索意向(客户搜索输出) -> CRM意向等级
+INTENT_MAP = {
+    '高': '高意向',
+    '中': '中意向',
+    '低': '低意向',
+    '无': '无意向',
+}
+
+# 线索合并时可补全的字段
+MERGE_FIELDS = ('source', 'description', 'amount', 'wechat')
+
+_NAME_NOISE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def iter_json_array(path: Path) -> Iterator[Dict]:
+    """流式解析JSON数组，逐个产出元素，不把整个文件读入内存"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(CHUNK_SIZE).lstrip()
+        if buffer.startswith('{'):
+            # 非数组（如外呼导出 {"leads": [...]}），退化为整体解析
+            data = json.loads(buffer + f.read())
+            yield from data.get('leads', [])
+            return
+        if not buffer.startswith('['):
+            raise ValueError(f"Not a JSON array: {path}")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+            if len(buffer) < CHUNK_SIZE and not eof:
+                chunk = f.read(CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+
+
+def iter_json_lines(path: Path) -> Iterator[Dict]:
+    """逐行解析JSON Lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_leads(path: Path) -> Iterator[Dict]:
+    """按扩展名选择解析方式"""
+    if path.suffix == '.jsonl':
+        return iter_json_lines(path)
+    return iter_json_array(path)
+
+
+def expand_paths(paths: List[Path]) -> List[Path]:
+    """目录展开为其中的 leads_*.json / leads_*.jsonl 文件"""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(list(path.glob("leads_*.json")) + list(path.glob("leads_*.jsonl"))))
+        else:
+            files.append(path)
+    return files
+
+
+def normalize_name(name: str) -> str:
+    """去掉空白与标点并小写"""
+    return _NAME_NOISE.sub('', name or '').lower()
+
+
+def name_key(name: str, source: str) -> Optional[str]:
+    """规范化姓名+来源的哈希，姓名为空时不参与去重"""
+    normalized = normalize_name(name)
+    if not normalized:
+        return None
+    return hashlib.md5(f"{normalized}|{source}".encode('utf-8')).hexdigest()
+
+
+class LeadImporter:
+    """线索导入器"""
+
+    def __init__(self, crm, dedup_name: bool = True):
+        self.crm = crm
+        self.dedup_name = dedup_name
+        self.counts = {'inserted': 0, 'skipped': 0, 'merged': 0, 'invalid': 0}
+        self._names: Dict[str, object] = {}
+
+    def _build_name_index(self):
+        if self.dedup_name:
+            for c in self.crm.customers:
+                key = name_key(c.name, c.source)
+                if key:
+                    self._names.setdefault(key, c)
+
+    @staticmethod
+    def to_customer_fields(lead: Dict) -> Dict:
+        """线索字段 -> 客户字段"""
+        intent = lead.get('intent_level', '中意向')
+        return {
+            'name': lead.get('name', lead.get('author', '客户')),
+            'phone': lead.get('phone', ''),
+            'source': lead.get('source', ''),
+            'description': (lead.get('content') or '')[:200],
+            'intent_level': INTENT_MAP.get(intent, intent),
+            'amount': lead.get('amount', 0),
+        }
+
+    def _find_existing(self, fields: Dict):
+        if fields['phone']:
+            existing = self.crm.index.get_by_phone(fields['phone'])
+            if existing:
+                return existing
+        if self.dedup_name:
+            key = name_key(fields['name'], fields['source'])
+            if key:
+                return self._names.get(key)
+        return None
+
+    def _merge(self, customer, fields: Dict) -> bool:
+        """用线索补全已有客户的空字段"""
+        updates = {k: fields[k] for k in MERGE_FIELDS
+                   if fields.get(k) and not getattr(customer, k)}
+        if not updates:
+            return False
+        self.crm.update_customer(customer.id, **updates)
+        self._index_name(customer)  # 补全来源后按新的 姓名+来源 也能找到
+        return True
+
+    def _index_name(self, customer):
+        if self.dedup_name:
+            key = name_key(customer.name, customer.source)
+            if key:
+                self._names.setdefault(key, customer)
+
+    def import_lead(self, lead: Dict):
+        if not isinstance(lead, dict):
+            self.counts['invalid'] += 1
+            return
+        fields = self.to_customer_fields(lead)
+        existing = self._find_existing(fields)
+        if existing:
+            self.counts['merged' if self._merge(existing, fields) else 'skipped'] += 1
+            return
+
+        customer = self.crm.add_customer(**fields)
+        self._index_name(customer)
+        self.counts['inserted'] += 1
+
+    def run(self, paths: List[Path]) -> Dict[str, int]:
+        """导入多个文件/目录，整批只落盘一次；中途出错时整批不落盘"""
+        files = expand_paths(paths)
+        self.crm._require('customers')  # 去重依赖电话索引
+        self._build_name_index()
+        with self.crm.batch():
+            for path in files:
+                try:
+                    for lead in iter_leads(path):
+                        self.import_lead(lead)
+                except ValueError as e:
+                    raise ValueError(f"Invalid lead file {path}: {e}") from e
+                logger.info(f"Imported {path.name}: {self.counts}")
+        return dict(self.counts, files=len(files))
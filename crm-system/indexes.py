@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+CRM内存索引
+随记录增删改增量维护，查询为常数时间
+"""
+
+from typing import List, Dict, Optional, Set
+
+
+class RecordView:
+    """随记录变更增量维护的视图基类
+
+    CRMSystem在新增记录后调用add，在删除记录前调用remove；
+    修改记录时先remove旧值，改完再add新值。
+    """
+
+    def add(self, kind: str, record):
+        """记录加入集合"""
+        handler = getattr(self, f"add_{kind[:-1]}", None)
+        if handler:
+            handler(record)
+
+    def remove(self, kind: str, record):
+        """记录离开集合"""
+        handler = getattr(self, f"remove_{kind[:-1]}", None)
+        if handler:
+            handler(record)
+
+    def load(self, kind: str, records: List):
+        """集合首次加载时批量加入"""
+        handler = getattr(self, f"add_{kind[:-1]}", None)
+        if handler:
+            for record in records:
+                handler(record)
+
+    def clear(self):
+        """清空视图"""
+        raise NotImplementedError
+
+    def rebuild(self, customers: List, followups: List, deals: List):
+        """从全量数据重建"""
+        self.clear()
+        self.load('customers', customers)
+        self.load('followups', followups)
+        self.load('deals', deals)
+
+    def add_customer(self, customer):
+        pass
+
+    def remove_customer(self, customer):
+        pass
+
+    def add_followup(self, followup):
+        pass
+
+    def remove_followup(self, followup):
+        pass
+
+    def add_deal(self, deal):
+        pass
+
+    def remove_deal(self, deal):
+        pass
+
+
+class CRMIndex(RecordView):
+    """主键与二级索引"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.customers: Dict[str, object] = {}                 # id -> Customer
+        self.by_phone: Dict[str, Dict[str, object]] = {}       # phone -> {id: Customer}
+        self.by_status: Dict[str, Set[str]] = {}               # status -> {id}
+        self.by_source: Dict[str, Set[str]] = {}               # source -> {id}
+        self.by_intent: Dict[str, Set[str]] = {}               # intent_level -> {id}
+        self.followups_by_customer: Dict[str, List] = {}       # customer_id -> [Followup]
+        self.deals_by_customer: Dict[str, List] = {}           # customer_id -> [Deal]
+        self.order: Dict[str, int] = {}                        # id -> 录入顺序
+
+    # ========== 客户 ==========
+
+    def add_customer(self, customer):
+        self.customers[customer.id] = customer
+        self.order.setdefault(customer.id, len(self.order))
+        self.by_phone.setdefault(customer.phone, {})[customer.id] = customer
+        self.by_status.setdefault(customer.status, set()).add(customer.id)
+        self.by_source.setdefault(customer.source, set()).add(customer.id)
+        self.by_intent.setdefault(customer.intent_level, set()).add(customer.id)
+
+    def remove_customer(self, customer):
+        self.customers.pop(customer.id, None)
+        self._discard(self.by_phone, customer.phone, customer.id)
+        self._discard(self.by_status, customer.status, customer.id)
+        self._discard(self.by_source, customer.source, customer.id)
+        self._discard(self.by_intent, customer.intent_level, customer.id)
+
+    @staticmethod
+    def _discard(index: Dict, key, record_id: str):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        if isinstance(bucket, dict):
+            bucket.pop(record_id, None)
+        else:
+            bucket.discard(record_id)
+        if not bucket:
+            del index[key]
+
+    # ========== 跟进/成交 ==========
+
+    def add_followup(self, followup):
+        self.followups_by_customer.setdefault(followup.customer_id, []).append(followup)
+
+    def remove_followup(self, followup):
+        self._remove_item(self.followups_by_customer, followup)
+
+    def add_deal(self, deal):
+        self.deals_by_customer.setdefault(deal.customer_id, []).append(deal)
+
+    def remove_deal(self, deal):
+        self._remove_item(self.deals_by_customer, deal)
+
+    @staticmethod
+    def _remove_item(index: Dict[str, List], record):
+        bucket = index.get(record.customer_id, [])
+        for i, item in enumerate(bucket):
+            if item is record:
+                del bucket[i]
+                break
+        if not bucket:
+            index.pop(record.customer_id, None)
+
+    # ========== 查询 ==========
+
+    def get_customer(self, customer_id: str):
+        return self.customers.get(customer_id)
+
+    def get_by_phone(self, phone: str):
+        """按电话取第一个客户"""
+        bucket = self.by_phone.get(phone)
+        return next(iter(bucket.values())) if bucket else None
+
+    def has_phone(self, phone: str) -> bool:
+        return phone in self.by_phone
+
+    def ids_with(self, status: str = "", source: str = "", intent: str = "") -> Optional[Set[str]]:
+        """按状态/来源/意向取客户ID集合，无过滤条件时返回None"""
+        result = None
+        for index, key in ((self.by_status, status), (self.by_source, source), (self.by_intent, intent)):
+            if not key:
+                continue
+            ids = index.get(key, set())
+            result = set(ids) if result is None else result & ids
+        return result
+
+    def sort_by_order(self, customers: List) -> List:
+        """按录入顺序排列"""
+        return sorted(customers, key=lambda c: self.order.get(c.id, 0))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+进程间文件锁
+基于fcntl.flock的建议锁，读共享、写排他，同一进程内可重入
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # 无fcntl的平台(Windows)不加锁
+    fcntl = None
+
+
+class FileLock:
+    """可重入的共享/排他文件锁"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+        self._guard = threading.RLock()  # 同进程内的线程互斥
+
+    def _flock(self, op: str):
+        if fcntl is None:
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, getattr(fcntl, op))
+
+    @contextmanager
+    def _hold(self, exclusive: bool):
+        with self._guard:
+            previous = self._exclusive
+            if self._depth == 0 or (exclusive and not previous):
+                # 持有共享锁时申请排他锁会先释放再加锁(flock升级非原子)
+                self._flock('LOCK_EX' if exclusive else 'LOCK_SH')
+                self._exclusive = exclusive or previous
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flock('LOCK_UN')
+                    self._exclusive = False
+                elif self._exclusive and not previous:
+                    self._flock('LOCK_SH')
+                    self._exclusive = False
+
+    def shared(self):
+        """读锁"""
+        return self._hold(exclusive=False)
+
+    def exclusive(self):
+        """写锁"""
+        return self._hold(exclusive=True)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
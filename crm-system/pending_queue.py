@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+待跟进队列
+按next_followup排序的有序索引，到期查询为O(log n + k)
+"""
+
+from bisect import bisect_right, insort
+from typing import List, Dict, Tuple
+
+from indexes import RecordView
+
+# 大于任何客户ID的哨兵，用于按时间上界二分
+_MAX_ID = "\U0010ffff"
+
+
+class PendingQueue(RecordView):
+    """待跟进客户的有序索引（已成交/流失的客户不入队）"""
+
+    def __init__(self, closed_statuses: Tuple[str, ...]):
+        self.closed_statuses = set(closed_statuses)
+        self.clear()
+
+    def clear(self):
+        self.entries: List[Tuple[int, str]] = []      # [(next_followup, customer_id)] 有序
+        self.keys: Dict[str, Tuple[int, str]] = {}    # customer_id -> 队列中的键
+        self.customers: Dict[str, object] = {}        # customer_id -> Customer
+
+    def load(self, kind: str, records: List):
+        if kind != 'customers':
+            return
+        # 首次加载整体排序，比逐条insort快
+        for customer in records:
+            if self._queued(customer):
+                key = (customer.next_followup, customer.id)
+                self.keys[customer.id] = key
+                self.customers[customer.id] = customer
+        self.entries = sorted(self.keys.values())
+
+    def _queued(self, customer) -> bool:
+        return bool(customer.next_followup) and customer.status not in self.closed_statuses
+
+    def add_customer(self, customer):
+        if not self._queued(customer):
+            return
+        key = (customer.next_followup, customer.id)
+        insort(self.entries, key)
+        self.keys[customer.id] = key
+        self.customers[customer.id] = customer
+
+    def remove_customer(self, customer):
+        key = self.keys.pop(customer.id, None)
+        if key is None:
+            return
+        self.customers.pop(customer.id, None)
+        i = bisect_right(self.entries, key) - 1
+        if i >= 0 and self.entries[i] == key:
+            del self.entries[i]
+
+    def due(self, until: int, since: int = 0) -> List[Tuple[object, int]]:
+        """next_followup(epoch秒)在[since, until]内的客户，按时间排序"""
+        start = bisect_right(self.entries, (since, "")) if since else 0
+        end = bisect_right(self.entries, (until, _MAX_ID))
+        return [(self.customers[cid], when) for when, cid in self.entries[start:end]]
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+CRM按天汇总
+随记录变更增量维护每日计数（可按状态/来源/意向/产品拆分），时间窗口与趋势查询为O(天数)
+
+物化: 汇总连同存储的变更标识写入 rollups.json，数据未变时新进程直接读取，无需加载记录。
+"""
+
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from indexes import RecordView
+from storage import atomic_write_text
+from timestamps import SECONDS_PER_DAY, day_to_str, local_day, str_to_day
+
+# 物化文件
+ROLLUP_FILE = "rollups.json"
+
+# 汇总指标
+METRICS = ('new_customers', 'won', 'followups', 'deals', 'deal_amount', 'deal_commission')
+
+# 派生指标: 成交客户 / 新增客户
+DERIVED_METRICS = ('conversion',)
+
+# 拆分维度 -> 客户字段
+DIMENSIONS = {
+    'status': 'status',
+    'source': 'source',
+    'intent': 'intent_level',
+    'product': 'product_type',
+}
+
+# 趋势粒度 -> 日期分桶格式
+INTERVALS = {
+    'day': '%Y-%m-%d',
+    'week': '%G-W%V',
+    'month': '%Y-%m',
+}
+
+
+def day_range(start: str, end: str) -> range:
+    """[start, end](YYYY-MM-DD)内每一天的日期序号"""
+    return range(str_to_day(start), str_to_day(end) + 1)
+
+
+class DailyRollups(RecordView):
+    """每日计数: 日期序号 -> {(指标, 维度, 取值): 数值}，维度为空表示合计"""
+
+    def __init__(self, won_status: str):
+        self.won_status = won_status
+        self.clear()
+
+    def clear(self):
+        self.days: Dict[int, Counter] = {}
+
+    def _bump(self, timestamp: int, sign: int, metric: str, value: float = 1, record=None, dims=()):
+        if not timestamp:
+            return
+        counter = self.days.setdefault(local_day(timestamp), Counter())
+        counter[(metric, '', '')] += sign * value
+        for dim in dims:
+            counter[(metric, dim, getattr(record, DIMENSIONS[dim]) or '未知')] += sign * value
+
+    def _apply_customer(self, customer, sign: int):
+        self._bump(customer.created_at, sign, 'new_customers', record=customer, dims=DIMENSIONS)
+        if customer.status == self.won_status:
+            self._bump(customer.converted_at, sign, 'won', record=customer, dims=('source', 'intent', 'product'))
+
+    def add_customer(self, customer):
+        self._apply_customer(customer, 1)
+
+    def remove_customer(self, customer):
+        self._apply_customer(customer, -1)
+
+    def add_followup(self, followup):
+        self._bump(followup.created_at, 1, 'followups')
+
+    def remove_followup(self, followup):
+        self._bump(followup.created_at, -1, 'followups')
+
+    def _apply_deal(self, deal, sign: int):
+        self._bump(deal.closed_at, sign, 'deals')
+        self._bump(deal.closed_at, sign, 'deal_amount', deal.amount)
+        self._bump(deal.closed_at, sign, 'deal_commission', deal.commission)
+
+    def add_deal(self, deal):
+        self._apply_deal(deal, 1)
+
+    def remove_deal(self, deal):
+        self._apply_deal(deal, -1)
+
+    # ========== 查询 ==========
+
+    def series(self, start: str, end: str) -> List[Tuple[str, Counter]]:
+        """[start, end]内每天的合计 [(YYYY-MM-DD, {指标: 数值})]"""
+        result = []
+        for day in day_range(start, end):
+            counter = self.days.get(day)
+            totals = Counter({m: v for (m, dim, _), v in counter.items() if not dim}) if counter else Counter()
+            result.append((day_to_str(day), totals))
+        return result
+
+    def totals(self, start: str, end: str) -> Counter:
+        """[start, end]内的合计"""
+        total = Counter()
+        for _, counter in self.series(start, end):
+            total.update(counter)
+        return total
+
+    def trend(self, start: str, end: str, metric: str, by: str = "",
+              interval: str = "day") -> List[Tuple[str, Dict[str, float]]]:
+        """按天/周/月汇总指标，by为维度时按取值拆分（合计的取值为''）
+
+        返回 [(时间段, {取值: 数值})]
+        """
+        if metric == 'conversion':
+            won = dict(self.trend(start, end, 'won', by, interval))
+            new = self.trend(start, end, 'new_customers', by, interval)
+            return [(label, {k: round(won[label].get(k, 0) / n * 100, 1) for k, n in values.items() if n > 0})
+                    for label, values in new]
+
+        fmt = INTERVALS[interval]
+        buckets: Dict[str, Counter] = {}
+        for day in day_range(start, end):
+            label = time.strftime(fmt, time.gmtime(day * SECONDS_PER_DAY))
+            bucket = buckets.setdefault(label, Counter())
+            for (m, dim, value), n in self.days.get(day, {}).items():
+                if m == metric and dim == by and n:
+                    bucket[value] += n
+        return [(label, dict(bucket)) for label, bucket in buckets.items()]
+
+    # ========== 物化 ==========
+
+    def save(self, path: Path, stamp):
+        """连同存储变更标识写入文件"""
+        days = {day_to_str(day): [[*key, n] for key, n in counter.items() if n]
+                for day, counter in sorted(self.days.items())}
+        atomic_write_text(path, json.dumps({'stamp': stamp, 'days': days}, ensure_ascii=False))
+
+    @classmethod
+    def restore(cls, path: Path, stamp, won_status: str) -> Optional['DailyRollups']:
+        """读取物化文件；文件不存在或与当前数据不一致时返回None"""
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding='utf-8'))
+        # 变更标识经JSON往返后元组变为列表，统一后比较
+        if data.get('stamp') != json.loads(json.dumps(stamp)):
+            return None
+        rollups = cls(won_status)
+        for day, entries in data['days'].items():
+            rollups.days[str_to_day(day)] = Counter({(m, dim, value): n for m, dim, value, n in entries})
+        return rollups
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+CRM全文检索
+字符n-gram倒排索引，中文无需分词
+"""
+
+from typing import Dict, Set
+
+from indexes import RecordView
+
+# 检索字段及权重
+FIELD_WEIGHTS = {
+    'name': 5,
+    'phone': 4,
+    'tags': 3,
+    'description': 1,
+}
+
+
+def ngrams(text: str) -> Set[str]:
+    """单字 + 双字gram"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    grams.discard(' ')
+    return grams
+
+
+class SearchIndex(RecordView):
+    """客户全文倒排索引"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.postings: Dict[str, Set[str]] = {}        # gram -> {customer_id}
+        self.docs: Dict[str, Dict[str, str]] = {}      # customer_id -> {字段: 小写文本}
+
+    @staticmethod
+    def _fields(customer) -> Dict[str, str]:
+        return {
+            'name': customer.name.lower(),
+            'phone': customer.phone,
+            'tags': ' '.join(customer.tags).lower(),
+            'description': customer.description.lower(),
+        }
+
+    def add_customer(self, customer):
+        doc = self._fields(customer)
+        self.docs[customer.id] = doc
+        for gram in ngrams(' '.join(doc.values())):
+            self.postings.setdefault(gram, set()).add(customer.id)
+
+    def remove_customer(self, customer):
+        doc = self.docs.pop(customer.id, None)
+        if doc is None:
+            return
+        for gram in ngrams(' '.join(doc.values())):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(customer.id)
+                if not ids:
+                    del self.postings[gram]
+
+    def _candidates(self, term: str) -> Set[str]:
+        """由gram倒排表求交集得到候选（可能有误报，需校验）"""
+        grams = sorted(ngrams(term), key=lambda g: len(self.postings.get(g, ())))
+        if not grams:
+            return set()
+        result = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not result:
+                break
+            result &= self.postings.get(gram, set())
+        return result
+
+    def _score(self, doc: Dict[str, str], term: str) -> int:
+        score = 0
+        for name, weight in FIELD_WEIGHTS.items():
+            text = doc[name]
+            hits = text.count(term)
+            if hits:
+                score += weight * hits
+                if text == term:
+                    score += weight * 2  # 整字段命中
+        return score
+
+    def search(self, query: str) -> Dict[str, int]:
+        """检索，多个词为AND关系，返回{客户ID: 相关度得分}"""
+        terms = query.lower().split()
+        if not terms:
+            return {}
+
+        scores: Dict[str, int] = {}
+        for i, term in enumerate(terms):
+            matched = {}
+            for customer_id in self._candidates(term):
+                if i > 0 and customer_id not in scores:
+                    continue
+                score = self._score(self.docs[customer_id], term)
+                if score:
+                    matched[customer_id] = scores.get(customer_id, 0) + score
+            scores = matched
+            if not scores:
+                break
+
+        return scores
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+CRM存储引擎
+可插拔后端: JSON整文件存储 / JSON快照+追加日志 / SQLite行级存储
+
+多进程并发: JSON类后端写入时持有数据目录下的文件锁，并在磁盘最新数据上合并变更；
+SQLite使用自身的事务锁。记录带version字段，写入时校验(乐观并发)，
+记录已被其他进程修改时抛出ConflictError。
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import typing
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+from locking import FileLock
+
+logger = logging.getLogger(__name__)
+
+# 数据集合
+COLLECTIONS = ('customers', 'followups', 'deals')
+
+# 日志条数超过该值时压缩进快照
+JOURNAL_COMPACT_THRESHOLD = 1000
+
+# 文件锁（JSON类后端）
+LOCK_FILE = ".crm.lock"
+
+# SQLite等待其他进程释放写锁的秒数
+SQLITE_BUSY_TIMEOUT = 30
+
+# SQLite二级索引
+SQLITE_INDEXES = {
+    'customers': ['phone', 'status', 'source', 'intent_level', 'next_followup'],
+    'followups': ['customer_id', 'created_at'],
+    'deals': ['customer_id', 'closed_at'],
+}
+
+
+class ConflictError(Exception):
+    """记录在加载后已被其他进程修改/删除"""
+
+    def __init__(self, kind: str, ids: List[str]):
+        self.kind = kind
+        self.ids = ids
+        super().__init__(f"{len(ids)} {kind} record(s) modified by another process: {', '.join(ids[:5])}")
+
+
+def check_versions(kind: str, upserts: List, stored: Dict[str, int]):
+    """乐观并发校验: 写入记录的版本号须恰好比存储中的大1（新记录存储版本视为0）"""
+    conflicts = [r.id for r in upserts if (stored.get(r.id) or 0) != r.version - 1]
+    if conflicts:
+        raise ConflictError(kind, conflicts)
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    name = ""
+    # 是否支持按行读写（无需把整个集合载入内存）
+    partial = False
+
+    def __init__(self, data_dir: Path, models: Dict[str, type]):
+        self.data_dir = Path(data_dir)
+        self.models = models
+
+    def load(self, kind: str) -> List[Dict]:
+        """加载集合的全部记录"""
+        raise NotImplementedError
+
+    def get(self, kind: str, record_id: str) -> Optional[Dict]:
+        """按ID读取单条记录"""
+        return next((r for r in self.load(kind) if r.get('id') == record_id), None)
+
+    def find(self, kind: str, **conditions) -> List[Dict]:
+        """按字段相等条件查询"""
+        return [r for r in self.load(kind)
+                if all(r.get(k) == v for k, v in conditions.items())]
+
+    def iter_rows(self, kind: str, **conditions) -> Iterator[Dict]:
+        """逐条产出满足字段相等条件的记录（行级存储不把结果集读入内存）"""
+        return iter(self.find(kind, **conditions))
+
+    def find_range(self, kind: str, field: str, low: Optional[int] = None,
+                   high: Optional[int] = None) -> List[Dict]:
+        """查询数值字段已设置(非0)且落在[low, high]内的记录，按该字段排序"""
+        model = self.models[kind]
+        matched = []
+        for row in self.load(kind):
+            value = getattr(model(**row), field)  # 经模型规范化（兼容旧格式数据）
+            if value and (low is None or value >= low) and (high is None or value <= high):
+                matched.append((value, row))
+        matched.sort(key=lambda item: item[0])
+        return [row for _, row in matched]
+
+    def write(self, kind: str, upserts: List, deletes: List[str], records: List):
+        """写入变更
+
+        upserts: 新增/修改的记录（version已递增）
+        deletes: 删除的记录ID
+        records: 集合当前的全部记录(仅供参考，后端以磁盘最新数据为准)
+        版本冲突时抛出ConflictError，该集合的本次变更全部不写入
+        """
+        raise NotImplementedError
+
+    def replace_all(self, kind: str, records: List):
+        """用给定记录整体替换集合"""
+        raise NotImplementedError
+
+    def stamp(self) -> Optional[tuple]:
+        """存储的变更标识，数据被写入后会改变，可跨进程比较（发现其他进程的写入、判断物化汇总是否过期）"""
+        return None
+
+    def close(self):
+        """关闭后端"""
+        pass
+
+
+def atomic_write_text(path: Path, text: str):
+    """写临时文件并fsync后原子替换，崩溃时不会留下截断的文件"""
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp建的文件权限为0600，改为与普通新建文件一致
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class JSONStorage(StorageBackend):
+    """JSON整文件存储（兼容旧数据）"""
+
+    name = "json"
+
+    def __init__(self, data_dir: Path, models: Dict[str, type]):
+        super().__init__(data_dir, models)
+        self.lock = FileLock(self.data_dir / LOCK_FILE)
+
+    def _file(self, kind: str) -> Path:
+        return self.data_dir / f"{kind}.json"
+
+    def _read_snapshot(self, kind: str) -> List[Dict]:
+        file_path = self._file(kind)
+        if not file_path.exists():
+            return []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_snapshot(self, kind: str, rows: Iterable[Dict]):
+        atomic_write_text(self._file(kind), json.dumps(list(rows), ensure_ascii=False, indent=2))
+
+    def load(self, kind: str) -> List[Dict]:
+        with self.lock.shared():
+            return self._read_snapshot(kind)
+
+    def write(self, kind: str, upserts: List, deletes: List[str], records: List):
+        if not upserts and not deletes:
+            return
+        # 在磁盘最新数据上合并，不覆盖其他进程写入的记录
+        with self.lock.exclusive():
+            current = {r['id']: r for r in self._read_snapshot(kind)}
+            check_versions(kind, upserts, {i: r.get('version') for i, r in current.items()})
+            for record in upserts:
+                current[record.id] = asdict(record)
+            for record_id in deletes:
+                current.pop(record_id, None)
+            self._write_snapshot(kind, current.values())
+
+    def replace_all(self, kind: str, records: List):
+        with self.lock.exclusive():
+            self._write_snapshot(kind, (asdict(r) for r in records))
+
+    def _files(self, kind: str) -> List[Path]:
+        return [self._file(kind)]
+
+    def stamp(self) -> Optional[tuple]:
+        stamp = []
+        for kind in self.models:
+            for path in self._files(kind):
+                try:
+                    st = path.stat()
+                    stamp.append((st.st_mtime_ns, st.st_size))
+                except FileNotFoundError:
+                    stamp.append(None)
+        return tuple(stamp)
+
+    def close(self):
+        self.lock.close()
+
+
+class JournalStorage(JSONStorage):
+    """JSON快照 + 追加日志
+
+    每次变更以JSON Lines追加到 <集合>.journal.jsonl（单条记录大小的写入），
+    加载时在快照上重放日志；日志超过阈值后把当前数据原子写回快照并清空日志。
+    快照文件与json后端格式相同。
+    多进程写入时各自追加日志，写前读取其他进程追加的部分以校验版本号。
+    """
+
+    name = "journal"
+
+    def __init__(self, data_dir: Path, models: Dict[str, type]):
+        super().__init__(data_dir, models)
+        self._journal_len: Dict[str, int] = {kind: 0 for kind in models}
+        # 已读到的日志位置、快照标识、记录版本，用于增量读取其他进程的追加
+        self._offset: Dict[str, int] = {kind: 0 for kind in models}
+        self._stamp: Dict[str, Optional[tuple]] = {kind: None for kind in models}
+        self._versions: Dict[str, Optional[Dict[str, int]]] = {kind: None for kind in models}
+
+    def _journal(self, kind: str) -> Path:
+        return self.data_dir / f"{kind}.journal.jsonl"
+
+    def _files(self, kind: str) -> List[Path]:
+        return [self._file(kind), self._journal(kind)]
+
+    def _snapshot_stamp(self, kind: str) -> Optional[tuple]:
+        try:
+            st = self._file(kind).stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read_journal(self, kind: str, start: int = 0) -> Tuple[List[Dict], int]:
+        """从start字节处读取日志，返回(条目, 结束位置)"""
+        path = self._journal(kind)
+        if not path.exists():
+            return [], 0
+        entries = []
+        offset = start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            lines = f.readlines()
+        for n, line in enumerate(lines):
+            if not line.endswith(b'\n'):
+                # 崩溃时写了一半的最后一行（即使内容恰好是完整JSON，写入也未完成），截掉以免后续追加与其粘连
+                logger.warning(f"Dropped torn journal entry in {path.name}")
+                os.truncate(path, offset)
+                break
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                if n == len(lines) - 1:
+                    logger.warning(f"Dropped torn journal entry in {path.name}")
+                    os.truncate(path, offset)
+                    break
+                raise
+            offset += len(line)
+        return entries, offset
+
+    def _replay(self, kind: str) -> Dict[str, Dict]:
+        """快照 + 日志 -> 当前记录，并刷新版本表（需持有锁）"""
+        stamp = self._snapshot_stamp(kind)
+        records = {r['id']: r for r in self._read_snapshot(kind)}
+        entries, offset = self._read_journal(kind)
+        for entry in entries:
+            if entry['op'] == 'put':
+                records[entry['id']] = entry['data']
+            else:
+                records.pop(entry['id'], None)
+        self._versions[kind] = {i: r.get('version') or 0 for i, r in records.items()}
+        self._offset[kind] = offset
+        self._stamp[kind] = stamp
+        self._journal_len[kind] = len(entries)
+        return records
+
+    def _catch_up(self, kind: str):
+        """读取其他进程追加的日志更新版本表；快照被其他进程压缩过则整体重读（需持有写锁）"""
+        if self._versions[kind] is None or self._snapshot_stamp(kind) != self._stamp[kind]:
+            self._replay(kind)
+            return
+        entries, offset = self._read_journal(kind, self._offset[kind])
+        versions = self._versions[kind]
+        for entry in entries:
+            if entry['op'] == 'put':
+                versions[entry['id']] = entry['data'].get('version') or 0
+            else:
+                versions.pop(entry['id'], None)
+        self._offset[kind] = offset
+        self._journal_len[kind] += len(entries)
+
+    def load(self, kind: str) -> List[Dict]:
+        with self.lock.shared():
+            return list(self._replay(kind).values())
+
+    def write(self, kind: str, upserts: List, deletes: List[str], records: List):
+        if not upserts and not deletes:
+            return
+        lines = [json.dumps({'op': 'put', 'id': r.id, 'data': asdict(r)}, ensure_ascii=False) for r in upserts]
+        lines += [json.dumps({'op': 'del', 'id': i}) for i in deletes]
+
+        with self.lock.exclusive():
+            self._catch_up(kind)
+            versions = self._versions[kind]
+            check_versions(kind, upserts, versions)
+            with open(self._journal(kind), 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._offset[kind] = self._journal(kind).stat().st_size
+
+            for r in upserts:
+                versions[r.id] = r.version
+            for record_id in deletes:
+                versions.pop(record_id, None)
+            self._journal_len[kind] += len(lines)
+            if self._journal_len[kind] >= JOURNAL_COMPACT_THRESHOLD:
+                self.compact(kind)
+
+    def compact(self, kind: str, records: Optional[List] = None):
+        """数据写回快照并清空日志（重放是幂等的，两步之间崩溃不丢数据）
+
+        records为None时以磁盘上的快照+日志为准（包含其他进程的写入）
+        """
+        with self.lock.exclusive():
+            if records is None:
+                rows = list(self._replay(kind).values())
+            else:
+                rows = [asdict(r) for r in records]
+            self._write_snapshot(kind, rows)
+            journal = self._journal(kind)
+            if journal.exists():
+                journal.unlink()
+            self._versions[kind] = {r['id']: r.get('version') or 0 for r in rows}
+            self._offset[kind] = 0
+            self._stamp[kind] = self._snapshot_stamp(kind)
+            self._journal_len[kind] = 0
+        logger.info(f"Compacted {kind} journal into snapshot ({len(rows)} records)")
+
+    def replace_all(self, kind: str, records: List):
+        self.compact(kind, records)
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite行级存储（WAL模式，写事务由SQLite在进程间互斥）"""
+
+    name = "sqlite"
+    partial = True
+
+    def __init__(self, data_dir: Path, models: Dict[str, type], db_name: str = "crm.db"):
+        super().__init__(data_dir, models)
+        self.db_path = self.data_dir / db_name
+        self.conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # 列名 -> 类型
+        self._columns = {kind: {f.name: f.type for f in fields(model)} for kind, model in models.items()}
+        self._list_columns = {kind: {n for n, tp in cols.items() if self._is_list(tp)} for kind, cols in self._columns.items()}
+        self._bool_columns = {kind: {n for n, tp in cols.items() if tp is bool} for kind, cols in self._columns.items()}
+        self._create_schema()
+
+    @staticmethod
+    def _affinity(tp) -> str:
+        if tp in (int, bool):
+            return "INTEGER"
+        if tp is float:
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def _is_list(tp) -> bool:
+        return typing.get_origin(tp) in (list, List)
+
+    def _create_table(self, kind: str):
+        columns = self._columns[kind]
+        col_defs = ", ".join(
+            f"{name} {self._affinity(tp)}" + (" PRIMARY KEY" if name == 'id' else "")
+            for name, tp in columns.items()
+        )
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {kind} ({col_defs})")
+
+    def _create_schema(self):
+        """建表、补列、建索引；列类型与模型不一致时重建表"""
+        with self.conn:
+            for kind, columns in self._columns.items():
+                self._create_table(kind)
+
+                existing = {row['name']: row['type'] for row in self.conn.execute(f"PRAGMA table_info({kind})")}
+                if any(name in existing and existing[name] != self._affinity(tp) for name, tp in columns.items()):
+                    self._rebuild_table(kind)
+                else:
+                    # 模型新增字段时补列
+                    for name, tp in columns.items():
+                        if name not in existing:
+                            self.conn.execute(f"ALTER TABLE {kind} ADD COLUMN {name} {self._affinity(tp)}")
+
+                for column in SQLITE_INDEXES.get(kind, []):
+                    if column in columns:
+                        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{kind}_{column} ON {kind} ({column})")
+
+    def _rebuild_table(self, kind: str):
+        """按当前模型重建表（如旧版字符串时间列改为整数），数据经模型转换后写回"""
+        model = self.models[kind]
+        records = [model(**self._decode(kind, row)) for row in self.conn.execute(f"SELECT * FROM {kind}")]
+        self.conn.execute(f"DROP TABLE {kind}")
+        self._create_table(kind)
+        self.conn.executemany(self._upsert_sql(kind), [self._encode(kind, r) for r in records])
+        logger.info(f"Rebuilt SQLite table {kind} for the current schema ({len(records)} rows)")
+
+    def _encode(self, kind: str, record) -> tuple:
+        row = asdict(record)
+        values = []
+        for name, tp in self._columns[kind].items():
+            value = row.get(name)
+            if self._is_list(tp):
+                value = json.dumps(value or [], ensure_ascii=False)
+            values.append(value)
+        return tuple(values)
+
+    def _decode(self, kind: str, row: sqlite3.Row) -> Dict:
+        # 空值使用模型默认值
+        data = {k: v for k, v in zip(row.keys(), row) if v is not None and k in self._columns[kind]}
+        for name in self._list_columns[kind]:
+            if name in data:
+                data[name] = json.loads(data[name])
+        for name in self._bool_columns[kind]:
+            if name in data:
+                data[name] = bool(data[name])
+        return data
+
+    def _upsert_sql(self, kind: str) -> str:
+        columns = list(self._columns[kind])
+        placeholders = ", ".join("?" for _ in columns)
+        return f"INSERT OR REPLACE INTO {kind} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def load(self, kind: str) -> List[Dict]:
+        rows = self.conn.execute(f"SELECT * FROM {kind}")
+        return [self._decode(kind, row) for row in rows]
+
+    def _check_columns(self, kind: str, *names: str):
+        unknown = [n for n in names if n not in self._columns[kind]]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {kind}: {', '.join(unknown)}")
+
+    def get(self, kind: str, record_id: str) -> Optional[Dict]:
+        row = self.conn.execute(f"SELECT * FROM {kind} WHERE id = ?", (record_id,)).fetchone()
+        return self._decode(kind, row) if row else None
+
+    def find(self, kind: str, **conditions) -> List[Dict]:
+        return list(self.iter_rows(kind, **conditions))
+
+    def iter_rows(self, kind: str, **conditions) -> Iterator[Dict]:
+        self._check_columns(kind, *conditions)
+        where = " AND ".join(f"{k} = ?" for k in conditions) or "1"
+        for row in self.conn.execute(f"SELECT * FROM {kind} WHERE {where}", tuple(conditions.values())):
+            yield self._decode(kind, row)
+
+    def find_range(self, kind: str, field: str, low: Optional[int] = None,
+                   high: Optional[int] = None) -> List[Dict]:
+        self._check_columns(kind, field)
+        clauses, params = [f"{field} > 0"], []
+        if low is not None:
+            clauses.append(f"{field} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{field} <= ?")
+            params.append(high)
+        rows = self.conn.execute(
+            f"SELECT * FROM {kind} WHERE {' AND '.join(clauses)} ORDER BY {field}", params
+        )
+        return [self._decode(kind, row) for row in rows]
+
+    def _stored_versions(self, kind: str, ids: List[str]) -> Dict[str, int]:
+        versions = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT id, version FROM {kind} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            versions.update((row['id'], row['version'] or 0) for row in rows)
+        return versions
+
+    def write(self, kind: str, upserts: List, deletes: List[str], records: List):
+        if not upserts and not deletes:
+            return
+        with self.conn:
+            # 立即取得写锁，校验与写入之间不会有其他进程插入
+            self.conn.execute("BEGIN IMMEDIATE")
+            if upserts:
+                check_versions(kind, upserts, self._stored_versions(kind, [r.id for r in upserts]))
+                self.conn.executemany(self._upsert_sql(kind), [self._encode(kind, r) for r in upserts])
+            if deletes:
+                self.conn.executemany(f"DELETE FROM {kind} WHERE id = ?", [(i,) for i in deletes])
+
+    def replace_all(self, kind: str, records: List):
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {kind}")
+            self.conn.executemany(self._upsert_sql(kind), [self._encode(kind, r) for r in records])
+
+    def stamp(self) -> Optional[tuple]:
+        # WAL模式下提交写入-wal文件，检查点写入主库文件
+        stamp = []
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            try:
+                st = path.stat()
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def close(self):
+        self.conn.close()
+
+
+BACKENDS = {
+    JSONStorage.name: JSONStorage,
+    JournalStorage.name: JournalStorage,
+    SQLiteStorage.name: SQLiteStorage,
+}
+
+
+def create_storage(backend: str, data_dir: Path, models: Dict[str, type]) -> StorageBackend:
+    """按名称创建存储后端"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend} (available: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](data_dir, models)
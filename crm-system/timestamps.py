@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+CRM时间表示
+记录内部使用epoch秒(int，0表示未设置)，只在显示、导出、解析输入时与字符串互转；
+按天统计使用本地日期序号(自1970-01-01起的天数)，不在循环里构造datetime
+"""
+
+import calendar
+import time
+from functools import lru_cache
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M'
+DATE_FORMAT = '%Y-%m-%d'
+
+# 可解析的输入/旧数据格式
+PARSE_FORMATS = (
+    TIME_FORMAT,
+    '%Y-%m-%d %H:%M:%S',
+    DATE_FORMAT,
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y/%m/%d %H:%M',
+    '%Y/%m/%d',
+)
+
+# 纯数字的旧数据: 按长度识别为紧凑日期格式；9~10位为epoch秒，13位为epoch毫秒
+DIGIT_FORMATS = {
+    8: '%Y%m%d',
+    14: '%Y%m%d%H%M%S',
+}
+EPOCH_SECONDS_DIGITS = (9, 10)
+EPOCH_MILLIS_DIGITS = 13
+
+SECONDS_PER_DAY = 86400
+
+# 小时 -> 本地时区偏移(秒)，夏令时切换按小时生效
+_utc_offsets: Dict[int, int] = {}
+
+
+def now_ts() -> int:
+    """当前时间"""
+    return int(time.time())
+
+
+@lru_cache(maxsize=65536)
+def _parse_text(text: str) -> int:
+    if text.isdigit():
+        if not int(text):
+            return 0
+        if len(text) in DIGIT_FORMATS:
+            return int(time.mktime(time.strptime(text, DIGIT_FORMATS[len(text)])))
+        if len(text) in EPOCH_SECONDS_DIGITS:
+            return int(text)
+        if len(text) == EPOCH_MILLIS_DIGITS:
+            return int(text) // 1000
+        raise ValueError(f"Unrecognized time: {text}")
+    for fmt in PARSE_FORMATS:
+        try:
+            return int(time.mktime(time.strptime(text, fmt)))
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized time: {text}")
+
+
+def parse_ts(value) -> int:
+    """时间值 -> epoch秒，兼容旧版 '%Y-%m-%d %H:%M' / '%Y-%m-%d' / '%Y%m%d' 等字符串，空值为0"""
+    if type(value) is int:
+        return value
+    if not value:
+        return 0
+    if isinstance(value, float):
+        return int(value)
+    return _parse_text(str(value).strip())
+
+
+def parse_ts_lenient(value) -> int:
+    """同parse_ts，无法识别的旧数据记为未设置而不是报错"""
+    try:
+        return parse_ts(value)
+    except ValueError:
+        logger.warning(f"Dropped unrecognized time value: {value!r}")
+        return 0
+
+
+def format_ts(ts: int, fmt: str = TIME_FORMAT) -> str:
+    """epoch秒 -> 本地时间字符串，未设置为空串"""
+    return time.strftime(fmt, time.localtime(ts)) if ts else ""
+
+
+def format_date(ts: int) -> str:
+    return format_ts(ts, DATE_FORMAT)
+
+
+def local_day(ts: int) -> int:
+    """epoch秒 -> 本地日期序号"""
+    hour = ts // 3600
+    offset = _utc_offsets.get(hour)
+    if offset is None:
+        offset = _utc_offsets[hour] = time.localtime(ts).tm_gmtoff
+    return (ts + offset) // SECONDS_PER_DAY
+
+
+def day_start(day: int) -> int:
+    """本地日期序号 -> 当天0点的epoch秒"""
+    ts = day * SECONDS_PER_DAY
+    return ts - time.localtime(ts).tm_gmtoff
+
+
+def day_to_str(day: int) -> str:
+    """本地日期序号 -> 'YYYY-MM-DD'"""
+    return time.strftime(DATE_FORMAT, time.gmtime(day * SECONDS_PER_DAY))
+
+
+def str_to_day(text: str) -> int:
+    """'YYYY-MM-DD' -> 本地日期序号"""
+    return calendar.timegm(time.strptime(text, DATE_FORMAT)) // SECONDS_PER_DAY
+
+
+def today() -> int:
+    """今天的本地日期序号"""
+    return local_day(now_ts())
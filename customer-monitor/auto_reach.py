@@ -6,6 +6,7 @@
 
 import json
 import re
+import sys
 import asyncio
 import time
 import random
@@ -16,6 +17,11 @@ from dataclasses import dataclass, asdict, field
 from enum import Enum
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from idgen import new_id
+
+from lead_store import LEAD_STORE_DIR, LeadStore
+
 # 配置
 DATA_DIR = Path("/home/codespace/clawd/customer-monitor/data")
 LOG_DIR = Path("/home/codespace/clawd/customer-monitor/logs")
@@ -167,9 +173,7 @@ class AutoReachSystem:
     
     def generate_task_id(self) -> str:
         """生成任务ID"""
-        import hashlib
-        timestamp = str(datetime.now().timestamp()).encode()
-        return hashlib.md5(timestamp).hexdigest()[:8]
+        return new_id()
     
     def create_reach_task(self, lead: Dict, intent_level: str = "中") -> ReachTask:
         """创建触达任务"""
@@ -500,18 +504,22 @@ def main():
     import sys
     
     # 加载线索数据
-    lead_files = list(DATA_DIR.glob("leads_*.json"))
-    if not lead_files:
+    store = LeadStore(DATA_DIR / LEAD_STORE_DIR)
+    latest_run = store.latest_run()
+    if not latest_run:
         print("❌ 未找到线索数据，请先运行客户搜索工具")
         return
     
-    # 加载最新的线索
-    latest_file = sorted(lead_files)[-1]
-    leads = json.loads(latest_file.read_text(encoding='utf-8'))
-    
     # 创建触达系统
     reach_system = AutoReachSystem()
     
+    # 加载最新一次搜索的线索（已建过触达任务的跳过）
+    leads = store.query(run=latest_run, exclude_ids={t.lead_id for t in reach_system.tasks})
+    store.close()
+    if not leads:
+        print("✅ 最新一批线索都已创建触达任务")
+        return
+    
     # 执行触达
     stats, report_file = reach_system.run_full_reach(leads)
     
@@ -6,7 +6,10 @@
 
 import json
 import re
+import sys
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -14,11 +17,31 @@ from dataclasses import dataclass, field, asdict
 from enum import Enum
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from idgen import new_id
+
+from intent_scorer import IntentScorer
+from lead_store import LEAD_STORE_DIR, LeadStore
+from near_duplicates import NearDuplicateDetector
+from seen_leads import SEEN_DB_FILE, SeenLeadStore, fingerprint
+
 # 配置
 DATA_DIR = Path("/home/codespace/clawd/customer-monitor/data")
 LOG_DIR = Path("/home/codespace/clawd/customer-monitor/logs")
 TEMPLATE_DIR = Path("/home/codespace/clawd/customer-monitor/templates")
 
+# 单个来源单个关键词的搜索超时（秒），超时或出错的来源本次跳过，其余来源照常返回
+SOURCE_TIMEOUT = 15
+
+# 每个平台同时进行的搜索数（多关键词并发时限流，防止触发平台频率限制）
+PLATFORM_CONCURRENCY = {
+    '百度搜索': 3,
+    '知乎': 2,
+    '抖音搜索': 1,
+    '小红书': 1,
+}
+DEFAULT_CONCURRENCY = 2
+
 # 创建目录
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -85,6 +108,7 @@ class Lead:
     updated_at: str = field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M'))
     followed_at: str = ""          # 最后跟进时间
     converted_at: str = ""         # 转化时间
+    source_urls: List[str] = field(default_factory=list)  # 合并进本条的近似重复线索的链接（含本条，空表示未合并）
 
 
 @dataclass
@@ -100,9 +124,24 @@ class SearchConfig:
 class CustomerSearchMonitor:
     """客户搜索监控"""
     
-    def __init__(self):
+    def __init__(self, only_new: bool = True):
         self.leads: List[Lead] = []
         self.config = self._load_config()
+        self.search_errors: Dict[str, str] = {}  # 最近一次搜索中失败的 "来源/关键词" -> 原因
+        
+        # 并发搜索: 每个平台一个线程池；超时后仍未返回的搜索数（占着线程，多次搜索间保留）
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._hung: Dict[str, int] = {}
+        self._hung_lock = threading.Lock()
+        
+        # 跨运行去重: 之前运行输出过的线索不再处理（only_new=False 时全部输出且不记录）
+        self.seen: Optional[SeenLeadStore] = SeenLeadStore(DATA_DIR / SEEN_DB_FILE) if only_new else None
+        self._fingerprints: Dict[str, int] = {}  # 本次搜到的线索ID -> 指纹，线索写入线索库后记入指纹库
+        self.near_duplicates = NearDuplicateDetector()
+        
+        # 线索库: 每次搜索的结果作为一个批次追加
+        self.store = LeadStore(DATA_DIR / LEAD_STORE_DIR)
+        self.last_run = ""
         
         # 关键词配置
         self.keyword_config = {
@@ -128,6 +167,10 @@ class CustomerSearchMonitor:
             '不要相信', '警惕', '骗局', '虚假', '违法'
         ]
         
+        # 评分引擎（关键词配置编译一次；修改上面两项配置后需重新创建）
+        self.scorer = IntentScorer(self.keyword_config, self.exclude_words,
+                                   levels=tuple(level.value for level in IntentLevel))
+        
         # 触达模板
         self.templates = self._load_templates()
     
@@ -174,64 +217,48 @@ class CustomerSearchMonitor:
     
     def _generate_lead_id(self) -> str:
         """生成线索ID"""
-        import hashlib
-        timestamp = str(datetime.now().timestamp()).encode()
-        return hashlib.md5(timestamp).hexdigest()[:8]
+        return new_id()
     
     def calculate_intent(self, content: str, keywords: List[str]) -> tuple:
-        """计算意向评分"""
-        content_lower = content.lower()
-        score = 0
-        triggered = []
-        matched_keywords = []
-        
-        # 匹配高意向关键词
-        for kw in self.keyword_config['高意向']:
-            if kw in content_lower:
-                score += 30
-                triggered.append(f"高:{kw}")
-                matched_keywords.append(kw)
-        
-        # 匹配中意向关键词
-        for kw in self.keyword_config['中意向']:
-            if kw in content_lower:
-                score += 15
-                triggered.append(f"中:{kw}")
-                matched_keywords.append(kw)
-        
-        # 匹配低意向关键词
-        for kw in self.keyword_config['低意向']:
-            if kw in content_lower:
-                score += 5
-                triggered.append(f"低:{kw}")
-                matched_keywords.append(kw)
-        
-        # 排除词扣分
-        for word in self.exclude_words:
-            if word in content_lower:
-                score = max(0, score - 50)
-                triggered.append(f"排:{word}")
-        
-        # 计算关键词匹配度
-        keyword_bonus = min(len(set(matched_keywords)) * 5, 30)
-        score = min(score + keyword_bonus, 100)
-        
-        # 意向等级
-        if score >= 70:
-            level = IntentLevel.HIGH.value
-        elif score >= 40:
-            level = IntentLevel.MEDIUM.value
-        elif score >= 10:
-            level = IntentLevel.LOW.value
-        else:
-            level = IntentLevel.NONE.value
+        """计算意向评分，返回 (评分, 意向等级, 触发词, 命中关键词)"""
+        result = self.scorer.score(content)
+        return result.score, result.level, result.triggered, result.matched
+    
+    def _build_leads(self, search_results: List[Dict], keyword: str, source: str, tag: str) -> List[Lead]:
+        """搜索结果 -> 线索: 先跳过之前运行输出过的结果，再对剩下的评分"""
+        fingerprints = [fingerprint(r['content'], r['url'], r['author']) for r in search_results]
+        if self.seen is not None:
+            fresh = [(r, fp) for r, fp in zip(search_results, fingerprints) if fp not in self.seen]
+            skipped = len(search_results) - len(fresh)
+            if skipped:
+                logger.info(f"  Skipped {skipped} leads seen in earlier runs")
+            search_results = [r for r, _ in fresh]
+            fingerprints = [fp for _, fp in fresh]
         
-        return score, level, triggered, matched_keywords
+        leads = []
+        intents = self.scorer.score_batch(r['content'] for r in search_results)
+        for result, intent, fp in zip(search_results, intents, fingerprints):
+            lead = Lead(
+                id=self._generate_lead_id(),
+                name=result['author'],
+                source=source,
+                keywords=[keyword],
+                intent_level=intent.level,
+                intent_score=intent.score,
+                status=LeadStatus.NEW.value,
+                content=result['content'],
+                url=result['url'],
+                contact_info='',
+                remark=f"触发词: {', '.join(intent.triggered)}",
+                tags=[tag, keyword]
+            )
+            self._fingerprints[lead.id] = fp
+            leads.append(lead)
+        return leads
     
     def search_baidu(self, keyword: str) -> List[Lead]:
         """百度搜索结果"""
         logger.info(f"🔍 百度搜索: {keyword}")
-        leads = []
         
         # 模拟搜索结果（实际需要API或爬虫）
         search_results = [
@@ -255,26 +282,7 @@ class CustomerSearchMonitor:
             }
         ]
         
-        for result in search_results:
-            score, level, triggered, matched = self.calculate_intent(
-                result['content'], [keyword]
-            )
-            
-            lead = Lead(
-                id=self._generate_lead_id(),
-                name=result['author'],
-                source=Source.BAIDU.value,
-                keywords=[keyword],
-                intent_level=level,
-                intent_score=score,
-                status=LeadStatus.NEW.value,
-                content=result['content'],
-                url=result['url'],
-                contact_info='',
-                remark=f"触发词: {', '.join(triggered)}",
-                tags=['搜索', keyword]
-            )
-            leads.append(lead)
+        leads = self._build_leads(search_results, keyword, Source.BAIDU.value, '搜索')
         
         logger.info(f"  ✅ 找到 {len(leads)} 条线索")
         return leads
@@ -282,7 +290,6 @@ class CustomerSearchMonitor:
     def search_zhihu(self, keyword: str) -> List[Lead]:
         """知乎搜索结果"""
         logger.info(f"🔍 知乎搜索: {keyword}")
-        leads = []
         
         # 模拟知乎结果
         search_results = [
@@ -300,26 +307,7 @@ class CustomerSearchMonitor:
             }
         ]
         
-        for result in search_results:
-            score, level, triggered, matched = self.calculate_intent(
-                result['content'], [keyword]
-            )
-            
-            lead = Lead(
-                id=self._generate_lead_id(),
-                name=result['author'],
-                source=Source.ZHIHU.value,
-                keywords=[keyword],
-                intent_level=level,
-                intent_score=score,
-                status=LeadStatus.NEW.value,
-                content=result['content'],
-                url=result['url'],
-                contact_info='',
-                remark=f"触发词: {', '.join(triggered)}",
-                tags=['知乎', keyword]
-            )
-            leads.append(lead)
+        leads = self._build_leads(search_results, keyword, Source.ZHIHU.value, '知乎')
         
         logger.info(f"  ✅ 找到 {len(leads)} 条线索")
         return leads
@@ -327,7 +315,6 @@ class CustomerSearchMonitor:
     def search_douyin(self, keyword: str) -> List[Lead]:
         """抖音搜索结果"""
         logger.info(f"🔍 抖音搜索: {keyword}")
-        leads = []
         
         # 模拟抖音搜索结果
         search_results = [
@@ -345,26 +332,7 @@ class CustomerSearchMonitor:
             }
         ]
         
-        for result in search_results:
-            score, level, triggered, matched = self.calculate_intent(
-                result['content'], [keyword]
-            )
-            
-            lead = Lead(
-                id=self._generate_lead_id(),
-                name=result['author'],
-                source=Source.DOUYIN.value,
-                keywords=[keyword],
-                intent_level=level,
-                intent_score=score,
-                status=LeadStatus.NEW.value,
-                content=result['content'],
-                url=result['url'],
-                contact_info='',
-                remark=f"触发词: {', '.join(triggered)}",
-                tags=['抖音', keyword]
-            )
-            leads.append(lead)
+        leads = self._build_leads(search_results, keyword, Source.DOUYIN.value, '抖音')
         
         logger.info(f"  ✅ 找到 {len(leads)} 条线索")
         return leads
@@ -372,7 +340,6 @@ class CustomerSearchMonitor:
     def search_xiaohongshu(self, keyword: str) -> List[Lead]:
         """小红书搜索结果"""
         logger.info(f"🔍 小红书搜索: {keyword}")
-        leads = []
         
         # 模拟小红书结果
         search_results = [
@@ -390,66 +357,146 @@ class CustomerSearchMonitor:
             }
         ]
         
-        for result in search_results:
-            score, level, triggered, matched = self.calculate_intent(
-                result['content'], [keyword]
-            )
-            
-            lead = Lead(
-                id=self._generate_lead_id(),
-                name=result['author'],
-                source=Source.XIAOHONGSHU.value,
-                keywords=[keyword],
-                intent_level=level,
-                intent_score=score,
-                status=LeadStatus.NEW.value,
-                content=result['content'],
-                url=result['url'],
-                contact_info='',
-                remark=f"触发词: {', '.join(triggered)}",
-                tags=['小红书', keyword]
-            )
-            leads.append(lead)
+        leads = self._build_leads(search_results, keyword, Source.XIAOHONGSHU.value, '小红书')
         
         logger.info(f"  ✅ 找到 {len(leads)} 条线索")
         return leads
     
-    def search_all_sources(self, keyword: str) -> List[Lead]:
-        """全平台搜索"""
-        logger.info(f"🌐 全平台搜索: {keyword}")
-        
-        all_leads = []
-        
-        # 百度搜索
-        if '百度搜索' in self.config.sources:
-            all_leads.extend(self.search_baidu(keyword))
-        
-        # 知乎搜索
-        if '知乎' in self.config.sources:
-            all_leads.extend(self.search_zhihu(keyword))
-        
-        # 抖音搜索
-        if '抖音搜索' in self.config.sources:
-            all_leads.extend(self.search_douyin(keyword))
-        
-        # 小红书搜索
-        if '小红书' in self.config.sources:
-            all_leads.extend(self.search_xiaohongshu(keyword))
-        
-        # 去重
-        seen = set()
-        unique_leads = []
+    # ========== 并发搜索 ==========
+
+    def _source_searchers(self) -> Dict:
+        """已启用的来源 -> 搜索方法（按固定顺序，结果合并顺序与并发完成顺序无关）"""
+        searchers = {
+            Source.BAIDU.value: self.search_baidu,
+            Source.ZHIHU.value: self.search_zhihu,
+            Source.DOUYIN.value: self.search_douyin,
+            Source.XIAOHONGSHU.value: self.search_xiaohongshu,
+        }
+        return {s: fn for s, fn in searchers.items() if s in self.config.sources}
+
+    async def _search_sources(self, keywords: List[str], timeout: float) -> Dict[str, List[Lead]]:
+        """关键词 × 来源 并发搜索；每个平台一个线程池，大小即PLATFORM_CONCURRENCY中的并发数
+
+        超时从搜索真正开始执行时计时（排队等待线程不计）；超时的搜索线程无法中断，
+        会一直占用该平台的一个线程直到返回（跨多次搜索），同一平台同时执行的搜索不超过并发数。
+        平台的线程全被超时未返回的搜索占住时，该平台排队中的搜索直接放弃，不再等待。
+        """
+        searchers = self._source_searchers()
+        limits = {s: PLATFORM_CONCURRENCY.get(s, DEFAULT_CONCURRENCY) for s in searchers}
+        loop = asyncio.get_running_loop()
+        stalled = {s: asyncio.Event() for s in searchers}   # 平台线程已全被占住
+        for source, limit in limits.items():
+            if source not in self._executors:
+                self._executors[source] = ThreadPoolExecutor(max_workers=limit,
+                                                             thread_name_prefix=f'search-{source}')
+            if self._hung.get(source, 0) >= limit:
+                stalled[source].set()
+
+        def release(source: str):
+            with self._hung_lock:
+                self._hung[source] -= 1
+
+        async def run(source: str, keyword: str) -> List[Lead]:
+            started = asyncio.Event()
+
+            def call() -> List[Lead]:
+                try:
+                    loop.call_soon_threadsafe(started.set)
+                except RuntimeError:  # 整体搜索已结束，事件循环已关闭
+                    pass
+                return searchers[source](keyword)
+
+            job = self._executors[source].submit(call)
+            try:
+                waiters = [asyncio.ensure_future(started.wait()), asyncio.ensure_future(stalled[source].wait())]
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters:
+                    waiter.cancel()
+                if not started.is_set() and job.cancel():
+                    raise RuntimeError(f"not started: {self._hung.get(source, 0)} earlier searches "
+                                       f"still running after timeout")
+                await started.wait()
+                try:
+                    return await asyncio.wait_for(asyncio.wrap_future(job), timeout)
+                except asyncio.TimeoutError:
+                    with self._hung_lock:
+                        self._hung[source] = self._hung.get(source, 0) + 1
+                        if self._hung[source] >= limits[source]:
+                            stalled[source].set()
+                    job.add_done_callback(lambda _: release(source))
+                    error = f"timed out after {timeout}s"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self.search_errors[f"{source}/{keyword}"] = error
+            logger.warning(f"Search failed on {source} for {keyword}: {error}")
+            return []
+
+        tasks = [(kw, run(source, kw)) for kw in keywords for source in searchers]
+        results = await asyncio.gather(*(task for _, task in tasks))
+
+        by_keyword: Dict[str, List[Lead]] = {kw: [] for kw in keywords}
+        for (kw, _), leads in zip(tasks, results):
+            by_keyword[kw].extend(leads)
+        return by_keyword
+
+    def _run_searches(self, keywords: List[str], timeout: Optional[float]) -> Dict[str, List[Lead]]:
+        self.search_errors = {}
+        self._fingerprints = {}
+        return asyncio.run(self._search_sources(keywords, SOURCE_TIMEOUT if timeout is None else timeout))
+
+    def mark_seen(self):
+        """把本次搜到的线索(含被去重掉的)记入指纹库，之后的运行不再输出；
+        在线索写入线索库之后调用，写入失败时下次运行会重新输出这些线索"""
+        if self.seen is not None and self._fingerprints:
+            added = self.seen.add(self._fingerprints.values())
+            logger.info(f"Recorded {added} new lead fingerprints ({len(self.seen)} total)")
+        self._fingerprints = {}
+
+    def _dedup_leads(self, all_leads: List[Lead]) -> List[Lead]:
+        """去重并按意向评分排序；跨关键词重复的线索合并触发关键词，
+        跨平台的近似重复线索合并为评分最高的一条，source_urls记录全部链接"""
+        unique: Dict[tuple, Lead] = {}
         for lead in all_leads:
             key = (lead.name, lead.source, lead.content[:50])
-            if key not in seen:
-                seen.add(key)
-                unique_leads.append(lead)
+            kept = unique.get(key)
+            if kept is None:
+                unique[key] = lead
+            else:
+                kept.keywords.extend(kw for kw in lead.keywords if kw not in kept.keywords)
+
+        candidates = list(unique.values())
+        unique_leads = []
+        for group in self.near_duplicates.cluster([lead.content for lead in candidates]):
+            members = [candidates[i] for i in group]
+            kept = max(members, key=lambda lead: lead.intent_score)
+            if len(members) > 1:
+                kept.source_urls = list(dict.fromkeys(lead.url for lead in [kept] + members if lead.url))
+                for lead in members:
+                    kept.keywords.extend(kw for kw in lead.keywords if kw not in kept.keywords)
+            unique_leads.append(kept)
         
-        # 按意向评分排序
         unique_leads.sort(key=lambda x: x.intent_score, reverse=True)
-        
-        self.leads = unique_leads
         return unique_leads
+
+    def search_all_sources(self, keyword: str, timeout: Optional[float] = None) -> List[Lead]:
+        """全平台搜索（各来源并发，单个来源失败或超时不影响其他来源）"""
+        logger.info(f"🌐 全平台搜索: {keyword}")
+
+        all_leads = self._run_searches([keyword], timeout)[keyword]
+
+        self.leads = self._dedup_leads(all_leads)
+        return self.leads
+
+    def search_keywords(self, keywords: List[str], timeout: Optional[float] = None) -> List[Lead]:
+        """多关键词全平台搜索: N个关键词 × 各来源并发，按平台限流"""
+        keywords = list(dict.fromkeys(keywords))
+        logger.info(f"🌐 多关键词搜索: {', '.join(keywords)}")
+
+        by_keyword = self._run_searches(keywords, timeout)
+
+        all_leads = [lead for kw in keywords for lead in by_keyword[kw]]
+        self.leads = self._dedup_leads(all_leads)
+        return self.leads
     
     def generate_leads_report(self, keyword: str) -> str:
         """生成线索报告"""
@@ -474,7 +521,7 @@ class CustomerSearchMonitor:
 | 高意向 | {len(high_intent)} |
 | 中意向 | {len(medium_intent)} |
 | 低意向 | {len(low_intent)} |
-| 平均意向评分 | {sum(l.intent_score for l in self.leads)/len(self.leads):.1f} |
+| 平均意向评分 | {sum(l.intent_score for l in self.leads)/max(len(self.leads), 1):.1f} |
 
 ---
 
@@ -574,8 +621,11 @@ class CustomerSearchMonitor:
         
         return report
     
-    def run_full_search(self, keyword: str):
-        """执行完整搜索"""
+    def run_full_search(self, keyword: str, extra_keywords: Optional[List[str]] = None):
+        """执行完整搜索（extra_keywords非空时多个关键词一起并发搜索）"""
+        keywords = [keyword] + list(extra_keywords or [])
+        if len(keywords) > 1:
+            keyword = '+'.join(dict.fromkeys(keywords))
         print("=" * 60)
         print(f"    🔍 客户搜索系统 v1.0")
         print(f"    搜索关键词: {keyword}")
@@ -583,8 +633,17 @@ class CustomerSearchMonitor:
         
         # 1. 全平台搜索
         print("\n🌐 全平台搜索...")
-        leads = self.search_all_sources(keyword)
+        if len(keywords) > 1:
+            leads = self.search_keywords(keywords)
+        else:
+            leads = self.search_all_sources(keyword)
         print(f"  ✅ 找到 {len(leads)} 条线索")
+        for failed, error in self.search_errors.items():
+            print(f"  ⚠️ {failed} 搜索失败: {error}")
+        
+        if not leads:
+            print("\n💤 没有新线索（之前运行输出过的线索已跳过），不生成报告和数据文件")
+            return leads, ""
         
         # 2. 统计
         high = len([l for l in leads if l.intent_level == IntentLevel.HIGH.value])
@@ -601,10 +660,9 @@ class CustomerSearchMonitor:
         report_file = DATA_DIR / f"leads_report_{keyword}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
         report_file.write_text(report, encoding='utf-8')
         
-        # 4. 保存数据
-        leads_file = DATA_DIR / f"leads_{keyword}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        leads_data = [asdict(l) for l in leads]
-        leads_file.write_text(json.dumps(leads_data, ensure_ascii=False, indent=2), encoding='utf-8')
+        # 4. 保存数据（追加到线索库，作为一个批次）
+        self.last_run = self.store.append(asdict(l) for l in leads)
+        self.mark_seen()
         
         # 5. 输出结果
         print("\n" + "=" * 60)
@@ -617,7 +675,7 @@ class CustomerSearchMonitor:
         print(f"   中意向: {medium} 个")
         
         print(f"\n📄 报告文件: {report_file}")
-        print(f"📦 数据文件: {leads_file}")
+        print(f"📦 线索库: {self.store.root} (批次 {self.last_run})")
         
         print("\n" + "=" * 60)
         print("    💡 建议行动")
@@ -629,9 +687,10 @@ class CustomerSearchMonitor:
         
         return leads, report
     
-    def export_leads_for_outreach(self, keyword: str):
-        """导出线索用于外呼"""
-        high_intent = [l for l in self.leads if l.intent_level == IntentLevel.HIGH.value]
+    def export_leads_for_outreach(self, keyword: str, run: str = ""):
+        """导出线索用于外呼（默认导出本次搜索批次的高意向线索，run指定其他批次）"""
+        run = run or self.last_run or self.store.latest_run()
+        high_intent = self.store.query(run=run, intent=IntentLevel.HIGH.value)
         
         export_data = {
             'keyword': keyword,
@@ -641,17 +700,17 @@ class CustomerSearchMonitor:
         }
         
         for lead in high_intent:
-            template = self.templates['私信'].get(lead.intent_level, '')
+            template = self.templates['私信'].get(lead['intent_level'], '')
             export_data['leads'].append({
-                'id': lead.id,
-                'name': lead.name,
-                'source': lead.source,
-                'intent_level': lead.intent_level,
-                'intent_score': lead.intent_score,
-                'content': lead.content,
-                'url': lead.url,
+                'id': lead['id'],
+                'name': lead['name'],
+                'source': lead['source'],
+                'intent_level': lead['intent_level'],
+                'intent_score': lead['intent_score'],
+                'content': lead['content'],
+                'url': lead['url'],
                 'message_template': template,
-                'status': lead.status
+                'status': lead['status']
             })
         
         export_file = DATA_DIR / f"outreach_{keyword}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -663,17 +722,21 @@ class CustomerSearchMonitor:
 def main():
     import sys
     
-    if len(sys.argv) < 2:
-        keyword = input("请输入搜索关键词: ").strip()
-    else:
-        keyword = sys.argv[1]
+    args = sys.argv[1:]
+    only_new = '--all' not in args   # --all: 输出全部线索，包括之前运行输出过的
+    keywords = [a for a in args if a != '--all']
+    if not keywords:
+        keywords = input("请输入搜索关键词: ").split()
     
-    if not keyword:
+    if not keywords:
         print("❌ 请输入关键词")
         return
     
-    monitor = CustomerSearchMonitor()
-    leads, report = monitor.run_full_search(keyword)
+    monitor = CustomerSearchMonitor(only_new=only_new)
+    leads, report = monitor.run_full_search(keywords[0], keywords[1:])
+    if not leads:
+        return
+    keyword = '+'.join(dict.fromkeys(keywords))
     
     # 导出外呼数据
     export_file = monitor.export_leads_for_outreach(keyword)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+意向评分引擎
+关键词配置只编译一次，一次扫描文本得到评分、意向等级、触发词与命中关键词；
+CustomerSearchMonitor 与 SocialMediaSearcher 共用，支持批量评分（安装NumPy时大批量向量化计算）
+"""
+
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 无numpy时批量评分逐条计算
+    np = None
+
+# 关键词组 -> (触发词前缀, 每个命中关键词的分值)，按此顺序记录触发词
+KEYWORD_GROUPS = {
+    '高意向': ('高', 30),
+    '中意向': ('中', 15),
+    '低意向': ('低', 5),
+}
+
+# 每个命中排除词扣分（扣到0为止）
+EXCLUDE_PREFIX = '排'
+EXCLUDE_PENALTY = 50
+
+# 高/中/低意向的最低分，低于最后一档为无意向
+LEVEL_THRESHOLDS = (70, 40, 10)
+
+# 关键词数达到该值时用Aho-Corasick自动机单次扫描；
+# 关键词少时逐词子串查找(C实现)更快
+AUTOMATON_MIN_PATTERNS = 100
+
+# 批量评分中不同文本数达到该值且装有NumPy时，用关键词命中矩阵向量化计算
+VECTORIZE_MIN_ROWS = 2000
+
+_SEPARATOR = '\0'   # 向量化匹配时拼接文本的分隔符
+
+
+class KeywordMatcher:
+    """多模式匹配: 返回文本中出现的全部模式(含重叠、互相包含的模式)"""
+
+    def __init__(self, patterns: List[str], automaton: Optional[bool] = None):
+        self.patterns = list(patterns)
+        if automaton is None:
+            automaton = len(self.patterns) >= AUTOMATON_MIN_PATTERNS
+        self.automaton = automaton
+        self._always = {i for i, p in enumerate(self.patterns) if not p}  # 空模式总是命中
+        self._scan = [(i, p) for i, p in enumerate(self.patterns) if p]
+        if automaton:
+            self._build()
+
+    def _build(self):
+        """构建goto/fail后展开为确定自动机: 每个状态一张 字符->状态 表"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for i, pattern in self._scan:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(i)
+
+        fail = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                outputs[nxt] |= outputs[fail[nxt]]
+                queue.append(nxt)
+
+        # 按BFS顺序展开，失败状态的转移表总是先于当前状态算好
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        for state in order:
+            table = dict(delta[fail[state]])
+            table.update(goto[state])
+            delta[state] = table
+        self._delta = delta
+        self._outputs = [frozenset(o) if o else None for o in outputs]
+
+    def find(self, text: str) -> List[int]:
+        """出现在text中的模式序号(升序)"""
+        if not self.automaton:
+            hits = [i for i, pattern in self._scan if pattern in text]
+            return sorted(self._always.union(hits)) if self._always else hits
+        delta, outputs = self._delta, self._outputs
+        hits = set(self._always)
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            out = outputs[state]
+            if out:
+                hits |= out
+        return sorted(hits)
+
+
+@dataclass(slots=True)
+class IntentResult:
+    """评分结果"""
+    score: int
+    level: str
+    triggered: List[str] = field(default_factory=list)   # ["高:急需贷款", ..., "排:骗局"]
+    matched: List[str] = field(default_factory=list)     # 命中的意向关键词
+
+
+class IntentScorer:
+    """意向评分器
+
+    评分规则: 每个命中关键词按所在组加分，每个命中排除词扣50分(不低于0)，
+    再加关键词奖励(不同关键词数×keyword_bonus，不超过bonus_cap)，总分不超过max_score
+    """
+
+    def __init__(self, keyword_config: Dict[str, List[str]], exclude_words: List[str],
+                 levels: Tuple[str, str, str, str] = ('高', '中', '低', '无'),
+                 keyword_bonus: int = 5, bonus_cap: int = 30, max_score: Optional[int] = 100,
+                 automaton: Optional[bool] = None):
+        self.levels = levels
+        self.keyword_bonus = keyword_bonus
+        self.bonus_cap = bonus_cap
+        self.max_score = max_score
+
+        # 规则按原逐组逐词的顺序排列: (触发词, 关键词或None(排除词), 分值)
+        self._rules: List[Tuple[str, Optional[str], int]] = []
+        patterns: Dict[str, int] = {}
+        rule_patterns = []
+        for group, (prefix, weight) in KEYWORD_GROUPS.items():
+            for kw in keyword_config.get(group, []):
+                self._rules.append((f"{prefix}:{kw}", kw, weight))
+                rule_patterns.append(kw)
+        for word in exclude_words:
+            self._rules.append((f"{EXCLUDE_PREFIX}:{word}", None, 0))
+            rule_patterns.append(word)
+
+        # 同一个词可能出现在多个组，匹配时只查一次；没有重复词时模式序号即规则序号
+        self._pattern_rules: List[List[int]] = []
+        for rule, pattern in enumerate(rule_patterns):
+            if pattern not in patterns:
+                patterns[pattern] = len(patterns)
+                self._pattern_rules.append([])
+            self._pattern_rules[patterns[pattern]].append(rule)
+        self._shared_patterns = len(patterns) < len(rule_patterns)
+        self.matcher = KeywordMatcher(list(patterns), automaton=automaton)
+        self._rule_pattern = [patterns[p] for p in rule_patterns]
+
+    def level(self, score: int) -> str:
+        """评分 -> 意向等级"""
+        high, medium, low = LEVEL_THRESHOLDS
+        if score >= high:
+            return self.levels[0]
+        if score >= medium:
+            return self.levels[1]
+        if score >= low:
+            return self.levels[2]
+        return self.levels[3]
+
+    def score(self, content: str) -> IntentResult:
+        """对一段文本评分（不区分大小写）"""
+        hits = self.matcher.find(content.lower())
+        if self._shared_patterns:
+            hits = sorted(r for p in hits for r in self._pattern_rules[p])
+
+        score, excluded = 0, 0
+        triggered, matched = [], []
+        rules = self._rules
+        for rule in hits:
+            label, kw, weight = rules[rule]
+            triggered.append(label)
+            if kw is None:
+                excluded += 1
+            else:
+                score += weight
+                matched.append(kw)
+        if excluded:
+            score = max(0, score - EXCLUDE_PENALTY * excluded)
+        if self.keyword_bonus:
+            score += min(len(set(matched)) * self.keyword_bonus, self.bonus_cap)
+        if self.max_score is not None and score > self.max_score:
+            score = self.max_score
+        return IntentResult(score, self.level(score), triggered, matched)
+
+    def score_batch(self, contents: Iterable[str], vectorized: Optional[bool] = None) -> List[IntentResult]:
+        """批量评分，相同文本(转发、重复评论)只计算一次；
+        vectorized为None时按不同文本数与是否安装NumPy自动选择，结果与逐条评分完全一致"""
+        contents = list(contents)
+        unique: Dict[str, int] = {}
+        for content in contents:
+            unique.setdefault(content, len(unique))
+        if vectorized is None:
+            vectorized = np is not None and len(unique) >= VECTORIZE_MIN_ROWS
+        if vectorized:
+            computed = self._results_from_matrix(list(unique))
+        else:
+            computed = [self.score(content) for content in unique]
+
+        results = []
+        used = [False] * len(computed)
+        for content in contents:
+            i = unique[content]
+            result = computed[i]
+            if used[i]:
+                result = IntentResult(result.score, result.level, list(result.triggered), list(result.matched))
+            used[i] = True
+            results.append(result)
+        return results
+
+    # ========== 向量化评分(NumPy) ==========
+
+    def hit_matrix(self, contents: List[str]):
+        """关键词命中矩阵 (文本数 × 模式数, bool)
+
+        全部文本(与逐条评分一样用str.lower转小写)以\\0分隔拼成一个码点数组，
+        每个不同的首字符做一次整列比较得到候选位置，再按模式的后续字符逐位筛选，最后按位置映射回行
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for vectorized scoring")
+        lowered = [content.lower() for content in contents]
+        n = len(lowered)
+        hits = np.zeros((n, len(self.matcher.patterns)), dtype=bool)
+        if not n:
+            return hits
+        lengths = np.fromiter(map(len, lowered), dtype=np.int64, count=n)
+        starts = np.zeros(n, dtype=np.int64)
+        np.cumsum(lengths[:-1] + 1, out=starts[1:])
+        # surrogatepass: 抓取的文本常有截断emoji留下的孤立代理码点，照常按一个码点编码
+        chars = np.frombuffer(_SEPARATOR.join(lowered).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+        by_first: Dict[str, List[int]] = {}
+        for j, pattern in enumerate(self.matcher.patterns):
+            if not pattern:
+                hits[:, j] = True
+            elif _SEPARATOR in pattern:   # 可能跨越两行，逐行查找
+                hits[:, j] = [pattern in text for text in lowered]
+            else:
+                by_first.setdefault(pattern[0], []).append(j)
+
+        for first, ids in by_first.items():
+            positions = np.flatnonzero(chars == ord(first))
+            for j in ids:
+                pattern = self.matcher.patterns[j]
+                candidates = positions[positions + len(pattern) <= len(chars)]
+                for k in range(1, len(pattern)):
+                    candidates = candidates[chars[candidates + k] == ord(pattern[k])]
+                hits[np.searchsorted(starts, candidates, side='right') - 1, j] = True
+        return hits
+
+    def score_arrays(self, contents: List[str]):
+        """向量化评分: 返回 (规则命中矩阵 文本数×规则数, 评分数组, 意向等级序号数组[0=levels[0]])"""
+        pattern_hits = self.hit_matrix(contents)
+        rule_hits = pattern_hits[:, self._rule_pattern]
+        weights = np.array([weight for _, _, weight in self._rules], dtype=np.int64)
+        is_exclude = np.array([kw is None for _, kw, _ in self._rules], dtype=bool)
+
+        scores = rule_hits.astype(np.int64) @ weights
+        excluded = rule_hits[:, is_exclude].sum(axis=1, dtype=np.int64)
+        scores = np.maximum(scores - EXCLUDE_PENALTY * excluded, 0)
+        if self.keyword_bonus:
+            # 不同关键词数 = 命中的、被意向关键词规则用到的模式数
+            keyword_patterns = np.zeros(pattern_hits.shape[1], dtype=bool)
+            keyword_patterns[[p for p, (_, kw, _) in zip(self._rule_pattern, self._rules) if kw is not None]] = True
+            distinct = pattern_hits[:, keyword_patterns].sum(axis=1, dtype=np.int64)
+            scores += np.minimum(distinct * self.keyword_bonus, self.bonus_cap)
+        if self.max_score is not None:
+            scores = np.minimum(scores, self.max_score)
+
+        # 阈值升序 (10, 40, 70) 上的位置: 0=无 … 3=高，换成levels下标
+        levels = len(LEVEL_THRESHOLDS) - np.searchsorted(sorted(LEVEL_THRESHOLDS), scores, side='right')
+        return rule_hits, scores, levels
+
+    def _results_from_matrix(self, contents: List[str]) -> List[IntentResult]:
+        rule_hits, scores, levels = self.score_arrays(contents)
+        rows, cols = np.nonzero(rule_hits)   # 按行、行内按规则序号升序，与逐条评分的触发词顺序一致
+        bounds = np.searchsorted(rows, np.arange(len(contents) + 1)).tolist()
+        cols = cols.tolist()
+        labels = [label for label, _, _ in self._rules]
+        keywords = [kw for _, kw, _ in self._rules]
+        results = []
+        for i, (score, level) in enumerate(zip(scores.tolist(), levels.tolist())):
+            hit = cols[bounds[i]:bounds[i + 1]]
+            results.append(IntentResult(score, self.levels[level], [labels[r] for r in hit],
+                                        [keywords[r] for r in hit if keywords[r] is not None]))
+        return results
+
+
+# ========== 基准测试 ==========
+
+# 合成评论用的关键词配置（与客户搜索的配置规模相当）
+BENCH_KEYWORDS = {
+    '高意向': ['急需贷款', '征信逾期', '贷款被拒', '急需资金', '征信不好', '黑户贷款',
+            '无条件贷款', '当天放款', '贷款下不来', '征信花了', '贷款审批', '贷款需要什么'],
+    '中意向': ['贷款利息', '哪个银行', '贷款条件', '怎么贷款', '贷款利率', '能贷多少',
+            '首次贷款', '信用贷款', '贷款流程', '贷款要求', '商业贷款', '公积金贷款'],
+    '低意向': ['贷款', '借钱', '资金', '周转', '买房', '装修', '买车', '创业', '投资', '分期'],
+}
+BENCH_EXCLUDE = ['诈骗', '骗子', '骗子贷款', '黑中介', '套路贷', '不要相信', '警惕', '骗局', '虚假', '违法']
+BENCH_FILLER = "我想问一下现在还能不能有没有办法的了吗呢急用钱在线等求助谢谢大家首付工资流水"
+BENCH_BROKEN_EMOJI = '\ud83d'   # 截断的emoji（孤立代理码点），校验向量化路径能处理
+BENCH_BROKEN_RATIO = 0.02
+
+
+def synthetic_comments(rows: int, duplicate_ratio: float, seed: int = 0) -> List[str]:
+    """合成评论: 10~60字，随机混入0~3个关键词/排除词，少量含截断emoji；duplicate_ratio比例为重复已有评论(转发、刷屏)"""
+    rng = random.Random(seed)
+    words = [w for group in BENCH_KEYWORDS.values() for w in group] + BENCH_EXCLUDE
+    comments = []
+    for _ in range(rows):
+        if comments and rng.random() < duplicate_ratio:
+            comments.append(rng.choice(comments))
+            continue
+        parts = [''.join(rng.choice(BENCH_FILLER) for _ in range(rng.randint(5, 20)))
+                 for _ in range(rng.randint(2, 3))]
+        for _ in range(rng.randint(0, 3)):
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(words))
+        if rng.random() < BENCH_BROKEN_RATIO:
+            parts.insert(rng.randrange(len(parts) + 1), BENCH_BROKEN_EMOJI)
+        comments.append(''.join(parts))
+    return comments
+
+
+def benchmark(rows: int, duplicate_ratio: float) -> List[Dict]:
+    """逐条评分 / 批量逐条 / 批量向量化 的耗时，并校验结果一致"""
+    scorer = IntentScorer(BENCH_KEYWORDS, BENCH_EXCLUDE)
+    comments = synthetic_comments(rows, duplicate_ratio)
+    timings = []
+
+    def timed(name: str, fn):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        timings.append({'path': name, 'seconds': round(elapsed, 3),
+                        'us_per_row': round(elapsed / rows * 1e6, 2)})
+        return value
+
+    expected = timed('score (per item)', lambda: [scorer.score(c) for c in comments])
+    scalar = timed('score_batch scalar', lambda: scorer.score_batch(comments, vectorized=False))
+    assert scalar == expected
+    if np is not None:
+        vectorized = timed('score_batch numpy', lambda: scorer.score_batch(comments, vectorized=True))
+        assert vectorized == expected, "vectorized results differ from per-item scoring"
+        timed('score_arrays numpy (scores/levels only)', lambda: scorer.score_arrays(comments))
+    return timings
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="意向评分基准: 逐条 vs NumPy向量化")
+    parser.add_argument('--rows', type=int, default=300000, help="评论条数")
+    parser.add_argument('--duplicates', type=float, default=0.2, help="重复评论比例")
+    args = parser.parse_args()
+
+    if np is None:
+        print("⚠️ 未安装numpy，只测逐条评分", file=sys.stderr)
+    print(f"rows={args.rows} duplicates={args.duplicates:.0%}")
+    for t in benchmark(args.rows, args.duplicates):
+        print(f"  {t['path']:<42} {t['seconds']:>8.3f}s  {t['us_per_row']:>7.2f} µs/row")
+
+
+if __name__ == '__main__':
+    main()
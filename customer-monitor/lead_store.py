@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+统一线索库
+线索按天追加写入 JSON Lines 分段(leads_YYYYMMDD.jsonl)，SQLite索引按关键词、来源、意向、日期、批次查询，
+只读取命中的行；旧的日分段可压缩为月分段(leads_YYYYMM.jsonl)
+"""
+
+import json
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+
+try:
+    import fcntl
+except ImportError:  # 无fcntl的平台(Windows)不加锁
+    fcntl = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from idgen import min_id_at, new_id
+
+logger = logging.getLogger(__name__)
+
+# 配置
+DATA_DIR = Path("/home/codespace/clawd/customer-monitor/data")
+
+# 线索库目录（位于数据目录下）
+LEAD_STORE_DIR = "leads"
+
+# 索引文件（可删除，打开时由分段重建）
+INDEX_FILE = "index.db"
+
+# 日分段超过该天数后可压缩进月分段
+COMPACT_AFTER_DAYS = 7
+
+SQLITE_BUSY_TIMEOUT = 10
+
+_DAY_SEGMENT = re.compile(r"^leads_(\d{8})\.jsonl$")
+_SEGMENT = re.compile(r"^leads_(\d{6}|\d{8})\.jsonl$")
+_LEGACY_TIME = re.compile(r"(\d{8}_\d{6})")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL              -- 已索引到的字节数
+);
+CREATE TABLE IF NOT EXISTS leads (
+    id TEXT PRIMARY KEY,               -- 同ID后写入的记录覆盖先写入的
+    run TEXT NOT NULL,                 -- 批次(一次搜索)，时间有序
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    day TEXT NOT NULL,                 -- YYYY-MM-DD
+    score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_run ON leads(run);
+CREATE INDEX IF NOT EXISTS idx_leads_day ON leads(day);
+CREATE INDEX IF NOT EXISTS idx_leads_source ON leads(source, day);
+CREATE INDEX IF NOT EXISTS idx_leads_intent ON leads(intent, day);
+CREATE INDEX IF NOT EXISTS idx_leads_segment ON leads(segment);
+CREATE TABLE IF NOT EXISTS lead_keywords (
+    keyword TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (keyword, id)
+) WITHOUT ROWID;
+"""
+
+
+class LeadStore:
+    """线索库
+
+    只追加写；打开时把各分段新增的行补进索引（其他进程追加的、或索引被删除后的全部行）
+    """
+
+    def __init__(self, root: Path = DATA_DIR / LEAD_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.root / INDEX_FILE), timeout=SQLITE_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.sync()
+
+    def close(self):
+        self.conn.close()
+
+    # ========== 写入 ==========
+
+    def append(self, leads: Iterable[Dict], run: str = "") -> str:
+        """追加一批线索（dict，如 asdict(Lead)），返回批次号"""
+        run = run or new_id()
+        data = ''.join(json.dumps(dict(lead, run_id=run), ensure_ascii=False) + '\n' for lead in leads)
+        if data:
+            path = self.root / f"leads_{datetime.now().strftime('%Y%m%d')}.jsonl"
+            self._write(path, data.encode('utf-8'))
+            self.sync()
+        return run
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        """整块追加，持有文件锁，与其他进程的追加不交错"""
+        with open(path, 'ab') as f:
+            if fcntl is None:
+                f.write(data)
+                return
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(data)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def import_files(self, paths: Iterable[Path]) -> int:
+        """导入旧版 leads_*.json 文件，每个文件一个批次（批次时间取文件名中的时间）"""
+        total = 0
+        for path in paths:
+            path = Path(path)
+            leads = [l for l in json.loads(path.read_text(encoding='utf-8')) if isinstance(l, dict)]
+            match = _LEGACY_TIME.search(path.stem)
+            moment = (datetime.strptime(match.group(1), '%Y%m%d_%H%M%S') if match
+                      else datetime.fromtimestamp(path.stat().st_mtime))
+            self.append(leads, run=min_id_at(moment))
+            total += len(leads)
+            logger.info(f"Imported {len(leads)} leads from {path.name}")
+        return total
+
+    # ========== 索引 ==========
+
+    def _segment_files(self) -> Dict[str, Path]:
+        return {p.name: p for p in sorted(self.root.glob("leads_*.jsonl")) if _SEGMENT.match(p.name)}
+
+    def sync(self):
+        """把分段中尚未索引的行补进索引；分段变短或消失时重建该分段的索引"""
+        files = self._segment_files()
+        indexed = dict(self.conn.execute("SELECT name, size FROM segments"))
+        with self.conn:
+            for name in indexed.keys() - files.keys():
+                self._drop_segment(name)
+            for name, path in files.items():
+                size = path.stat().st_size
+                start = indexed.get(name, 0)
+                if size < start:
+                    self._drop_segment(name)
+                    start = 0
+                if size > start:
+                    self._index_segment(name, path, start)
+
+    def _drop_segment(self, name: str):
+        self.conn.execute("DELETE FROM lead_keywords WHERE id IN (SELECT id FROM leads WHERE segment = ?)", (name,))
+        self.conn.execute("DELETE FROM leads WHERE segment = ?", (name,))
+        self.conn.execute("DELETE FROM segments WHERE name = ?", (name,))
+
+    def _index_segment(self, name: str, path: Path, start: int):
+        """索引分段从start起的完整行（末尾未写完的行留到下次）"""
+        offset = start
+        rows, keywords = [], []
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    try:
+                        lead = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipped corrupt line in {name} at byte {offset}")
+                        offset += len(line)
+                        continue
+                    lead_id = lead.get('id') or f"{name}:{offset}"
+                    rows.append((lead_id, lead.get('run_id', ''), name, offset, len(line),
+                                 lead.get('source', ''), lead.get('intent_level', ''),
+                                 (lead.get('created_at') or '')[:10], lead.get('intent_score') or 0))
+                    keywords.extend((kw, lead_id) for kw in lead.get('keywords') or [])
+                offset += len(line)
+        ids = [(r[0],) for r in rows]
+        self.conn.executemany("DELETE FROM lead_keywords WHERE id = ?", ids)
+        self.conn.executemany("INSERT OR REPLACE INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.executemany("INSERT OR IGNORE INTO lead_keywords VALUES (?, ?)", keywords)
+        self.conn.execute("INSERT OR REPLACE INTO segments VALUES (?, ?)", (name, offset))
+
+    # ========== 查询 ==========
+
+    def _where(self, keyword: str, source: str, intent: str, since: str, until: str,
+               run: str, exclude_ids: Optional[Iterable[str]]) -> tuple:
+        conditions, params = [], []
+        if keyword:
+            conditions.append("id IN (SELECT id FROM lead_keywords WHERE keyword = ?)")
+            params.append(keyword)
+        for column, value in (('source', source), ('intent', intent), ('run', run)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("day >= ?")
+            params.append(since)
+        if until:
+            conditions.append("day <= ?")
+            params.append(until)
+        if exclude_ids:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS excluded (id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM excluded")
+            self.conn.executemany("INSERT OR IGNORE INTO excluded VALUES (?)", ((i,) for i in exclude_ids))
+            conditions.append("id NOT IN (SELECT id FROM excluded)")
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def query(self, keyword: str = "", source: str = "", intent: str = "",
+              since: str = "", until: str = "", run: str = "",
+              exclude_ids: Optional[Iterable[str]] = None,
+              order: str = "score", limit: int = 0) -> List[Dict]:
+        """按条件查询线索；日期为YYYY-MM-DD（含）；order: score(评分从高到低) / time(写入先后)"""
+        where, params = self._where(keyword, source, intent, since, until, run, exclude_ids)
+        order_by = "score DESC, id" if order == "score" else "run, id"
+        sql = f"SELECT segment, offset, length FROM leads{where} ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._read(self.conn.execute(sql, params).fetchall())
+
+    def count(self, keyword: str = "", source: str = "", intent: str = "",
+              since: str = "", until: str = "", run: str = "") -> int:
+        where, params = self._where(keyword, source, intent, since, until, run, None)
+        return self.conn.execute(f"SELECT COUNT(*) FROM leads{where}", params).fetchone()[0]
+
+    def _read(self, locations: List[tuple]) -> List[Dict]:
+        """按位置读取记录：每个分段打开一次，按偏移顺序读，结果保持查询顺序"""
+        results: List[Optional[Dict]] = [None] * len(locations)
+        by_segment: Dict[str, List[tuple]] = {}
+        for i, (segment, offset, length) in enumerate(locations):
+            by_segment.setdefault(segment, []).append((offset, length, i))
+        for segment, items in by_segment.items():
+            with open(self.root / segment, 'rb') as f:
+                for offset, length, i in sorted(items):
+                    f.seek(offset)
+                    results[i] = json.loads(f.read(length))
+        return results
+
+    def runs(self) -> List[str]:
+        """全部批次，从早到晚"""
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT run FROM leads ORDER BY run")]
+
+    def latest_run(self) -> str:
+        row = self.conn.execute("SELECT MAX(run) FROM leads").fetchone()
+        return row[0] or ""
+
+    def stats(self) -> Dict:
+        """线索数、批次数、分段数，以及按来源/意向的分布"""
+        def grouped(column: str) -> Dict[str, int]:
+            return dict(self.conn.execute(f"SELECT {column}, COUNT(*) FROM leads GROUP BY {column} ORDER BY 2 DESC"))
+        return {
+            'leads': self.count(),
+            'runs': self.conn.execute("SELECT COUNT(DISTINCT run) FROM leads").fetchone()[0],
+            'segments': self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0],
+            'by_source': grouped('source'),
+            'by_intent': grouped('intent'),
+        }
+
+    # ========== 压缩 ==========
+
+    def compact(self, older_than_days: int = COMPACT_AFTER_DAYS) -> Dict[str, int]:
+        """把早于N天的日分段合并进月分段：只保留每个ID最新的记录，删除原日分段"""
+        self.sync()
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime('%Y%m%d')
+        months: Dict[str, List[str]] = {}
+        for name in self._segment_files():
+            match = _DAY_SEGMENT.match(name)
+            if match and match.group(1) < cutoff:
+                months.setdefault(match.group(1)[:6], []).append(name)
+
+        counts = {'segments': 0, 'records': 0, 'dropped': 0}
+        for month, names in sorted(months.items()):
+            target = f"leads_{month}.jsonl"
+            target_path = self.root / target
+            placeholders = ','.join('?' * len(names))
+            live = {(segment, offset): lead_id for lead_id, segment, offset in self.conn.execute(
+                f"SELECT id, segment, offset FROM leads WHERE segment IN ({placeholders})", names)}
+            lines = []
+            for segment in names:
+                offset = 0
+                with open(self.root / segment, 'rb') as f:
+                    for line in f:
+                        lead_id = live.get((segment, offset))
+                        if lead_id:
+                            lines.append((lead_id, line))
+                        elif line.strip():
+                            counts['dropped'] += 1   # 被同ID的新记录覆盖
+                        offset += len(line)
+
+            start = target_path.stat().st_size if target_path.exists() else 0
+            self._write(target_path, b''.join(line for _, line in lines))
+            with self.conn:
+                offset = start
+                for lead_id, line in lines:
+                    self.conn.execute("UPDATE leads SET segment = ?, offset = ? WHERE id = ?",
+                                      (target, offset, lead_id))
+                    offset += len(line)
+                self.conn.execute("INSERT OR REPLACE INTO segments VALUES (?, ?)", (target, offset))
+                self.conn.executemany("DELETE FROM segments WHERE name = ?", [(n,) for n in names])
+            for name in names:
+                (self.root / name).unlink()
+            counts['segments'] += len(names)
+            counts['records'] += len(lines)
+            logger.info(f"Compacted {len(names)} segments into {target} ({len(lines)} records)")
+        return counts
+
+
+def main():
+    """命令行: stats / compact [天数] / import <leads_*.json...>"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = LeadStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if command == 'compact':
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else COMPACT_AFTER_DAYS
+        print(json.dumps(store.compact(days), ensure_ascii=False))
+    elif command == 'import':
+        paths = [Path(p) for p in sys.argv[2:]] or sorted(DATA_DIR.glob("leads_*.json"))
+        print(f"✅ 导入 {store.import_files(paths)} 条线索")
+    else:
+        print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
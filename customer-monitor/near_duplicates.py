@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+近似重复检测
+字符二元组的MinHash签名 + LSH分桶，只比较同桶内的文本，数万条帖子也接近线性；
+同一条求助稍作改动后在多个平台重复发布时，合并为一条线索
+"""
+
+import hashlib
+import re
+import struct
+from typing import Dict, List, Set
+
+# 签名长度 = 分段数 × 每段行数；某一段签名完全相同的两条文本进入同一个桶，成为候选对
+NUM_BANDS = 16
+BAND_ROWS = 4
+
+# 候选对的字符二元组Jaccard相似度达到该值才判为近似重复
+SIMILARITY_THRESHOLD = 0.6
+
+# 每个桶最多保留的簇代表数，新文本只与代表比较，限制最坏情况下的比较次数
+MAX_BUCKET_CLUSTERS = 32
+
+SHINGLE_SIZE = 2
+
+_NOISE = re.compile(r"[\W_]+")   # 空白与标点
+
+
+def shingles(text: str) -> Set[str]:
+    """去掉空白标点、转小写后的字符二元组集合"""
+    text = _NOISE.sub('', (text or '').lower())
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateDetector:
+    """近似重复文本聚类（MinHash-LSH）"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD,
+                 bands: int = NUM_BANDS, rows: int = BAND_ROWS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        # 每个二元组一次SHAKE-128摘要，拆成 bands×rows 个32位哈希值（相当于同样多个独立哈希函数）
+        self._unpack = struct.Struct(f"<{bands * rows}I").unpack
+        self._digest_size = bands * rows * 4
+
+    def signature(self, shingle_set: Set[str]) -> List[int]:
+        """MinHash签名: 每个哈希函数在全部二元组上的最小值"""
+        unpack, size = self._unpack, self._digest_size
+        rows = [unpack(hashlib.shake_128(s.encode('utf-8')).digest(size)) for s in shingle_set]
+        return list(map(min, *rows)) if len(rows) > 1 else list(rows[0])
+
+    def cluster(self, texts: List[str]) -> List[List[int]]:
+        """把文本按近似重复分簇，返回下标分组（每个下标恰好出现一次，组内与组间均按原顺序）"""
+        sets = [shingles(t) for t in texts]
+        parent = list(range(len(texts)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(x: int, y: int):
+            x, y = find(x), find(y)
+            if x != y:
+                parent[max(x, y)] = min(x, y)
+
+        # 完全相同的文本直接合并，不重复计算签名
+        first: Dict[frozenset, int] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        rows = self.rows
+        for i, shingle_set in enumerate(sets):
+            if not shingle_set:
+                continue
+            key = frozenset(shingle_set)
+            if key in first:
+                union(first[key], i)
+                continue
+            first[key] = i
+
+            sig = self.signature(shingle_set)
+            for band in range(self.bands):
+                reps = buckets.setdefault((band, *sig[band * rows:(band + 1) * rows]), [])
+                for rep in reps:
+                    if find(rep) == find(i):
+                        break
+                    if jaccard(sets[rep], shingle_set) >= self.threshold:
+                        union(rep, i)
+                        break
+                else:
+                    if len(reps) < MAX_BUCKET_CLUSTERS:
+                        reps.append(i)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(texts)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
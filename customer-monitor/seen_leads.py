@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+跨运行线索去重
+记录已输出过的线索指纹(内容+链接+作者的哈希)，每次运行只处理、输出新线索；指纹超过有效期后失效
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 指纹库文件（位于数据目录下），删除即重置
+SEEN_DB_FILE = "seen_leads.db"
+
+# 指纹有效期（天），过期后同一条线索会作为新线索再次输出
+SEEN_TTL_DAYS = 30
+
+# 多个进程同时写入时等待锁的秒数
+SQLITE_BUSY_TIMEOUT = 10
+
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(content: str, url: str, author: str) -> int:
+    """线索指纹: 内容(去空白、小写) + 链接 + 作者 的64位哈希"""
+    text = _SPACES.sub('', content or '').lower()
+    key = f"{text}\x1f{(url or '').strip()}\x1f{(author or '').strip()}"
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class SeenLeadStore:
+    """已输出线索的指纹库（SQLite）
+
+    打开时清理过期指纹并把其余指纹载入内存，查询只查内存集合（可在搜索线程中调用）；
+    add() 写入磁盘，已存在的指纹保留首次记录时间，不会因重复出现而延长有效期
+    """
+
+    def __init__(self, db_path: Path, ttl_days: float = SEEN_TTL_DAYS):
+        self.db_path = Path(db_path)
+        self.ttl = int(ttl_days * 86400)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen ("
+                          "fingerprint INTEGER PRIMARY KEY, seen_at INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_at ON seen(seen_at)")
+        self.conn.commit()
+        self.expire()
+        self._seen = {row[0] for row in self.conn.execute("SELECT fingerprint FROM seen")}
+
+    def __contains__(self, fp: int) -> bool:
+        return fp in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def expire(self) -> int:
+        """删除过期指纹，返回删除数"""
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM seen WHERE seen_at < ?",
+                                        (int(time.time()) - self.ttl,)).rowcount
+        if removed:
+            logger.info(f"Expired {removed} lead fingerprints older than {self.ttl // 86400} days")
+        return removed
+
+    def add(self, fingerprints: Iterable[int]) -> int:
+        """记录指纹，返回新增数"""
+        new = set(fingerprints) - self._seen
+        if not new:
+            return 0
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen (fingerprint, seen_at) VALUES (?, ?)",
+                                  ((fp, now) for fp in new))
+        self._seen |= new
+        return len(new)
+
+    def close(self):
+        self.conn.close()
@@ -16,6 +16,10 @@ from bs4 import BeautifulSoup
 from urllib.parse import quote_plus
 import logging
 
+from intent_scorer import IntentScorer
+from near_duplicates import NearDuplicateDetector
+from seen_leads import SEEN_DB_FILE, SeenLeadStore, fingerprint
+
 # 配置
 DATA_DIR = Path("/home/codespace/clawd/customer-monitor/data")
 LOG_DIR = Path("/home/codespace/clawd/customer-monitor/logs")
@@ -180,10 +184,15 @@ class XiaohongshuSpider:
 class SocialMediaSearcher:
     """社交媒体搜索器（整合抖音+小红书）"""
     
-    def __init__(self):
+    def __init__(self, only_new: bool = True):
         self.douyin = DouyinSpider()
         self.xiaohongshu = XiaohongshuSpider()
         
+        # 跨运行去重: 之前运行输出过的帖子/评论不再处理（only_new=False 时全部输出且不记录）
+        self.seen: Optional[SeenLeadStore] = SeenLeadStore(DATA_DIR / SEEN_DB_FILE) if only_new else None
+        self._fingerprints: List[int] = []  # 本次搜到的结果指纹，数据文件写入后记入指纹库
+        self.near_duplicates = NearDuplicateDetector()
+        
         # 关键词配置
         self.keywords = {
             '高意向': [
@@ -205,43 +214,16 @@ class SocialMediaSearcher:
             '诈骗', '骗子', '黑中介', '骗局', '套路贷',
             '不要相信', '警惕', '虚假', '违法'
         ]
+        
+        # 评分引擎（不加关键词奖励、不封顶，与原评分一致）
+        self.scorer = IntentScorer(self.keywords, self.exclude_words,
+                                   levels=('高意向', '中意向', '低意向', '无意向'),
+                                   keyword_bonus=0, max_score=None)
     
     def calculate_intent(self, content: str, keyword: str) -> tuple:
-        """计算意向"""
-        content_lower = content.lower()
-        score = 0
-        
-        # 高意向关键词
-        for kw in self.keywords['高意向']:
-            if kw in content_lower:
-                score += 30
-        
-        # 中意向关键词
-        for kw in self.keywords['中意向']:
-            if kw in content_lower:
-                score += 15
-        
-        # 低意向关键词
-        for kw in self.keywords['低意向']:
-            if kw in content_lower:
-                score += 5
-        
-        # 排除词扣分
-        for word in self.exclude_words:
-            if word in content_lower:
-                score = max(0, score - 50)
-        
-        # 意向等级
-        if score >= 70:
-            level = '高意向'
-        elif score >= 40:
-            level = '中意向'
-        elif score >= 10:
-            level = '低意向'
-        else:
-            level = '无意向'
-        
-        return score, level
+        """计算意向，返回 (评分, 意向等级)"""
+        result = self.scorer.score(content)
+        return result.score, result.level
     
     def search_all(self, keyword: str) -> List[Dict]:
         """全平台搜索"""
@@ -257,18 +239,47 @@ class SocialMediaSearcher:
         all_results.extend(self.xiaohongshu.search_notes(keyword))
         all_results.extend(self.xiaohongshu.search_comments(keyword))
         
+        # 跳过之前运行输出过的结果
+        if self.seen is not None:
+            fingerprints = [fingerprint(r.get('desc', '') + r.get('content', ''), r.get('url', ''),
+                                        r.get('author', '')) for r in all_results]
+            fresh = [r for r, fp in zip(all_results, fingerprints) if fp not in self.seen]
+            if len(fresh) < len(all_results):
+                logger.info(f"  Skipped {len(all_results) - len(fresh)} results seen in earlier runs")
+            all_results = fresh
+            self._fingerprints = fingerprints
+        
         # 计算意向
-        for result in all_results:
-            content = result.get('desc', '') + result.get('content', '')
-            score, level = self.calculate_intent(content, keyword)
-            result['intent_score'] = score
-            result['intent_level'] = level
+        intents = self.scorer.score_batch(r.get('desc', '') + r.get('content', '') for r in all_results)
+        for result, intent in zip(all_results, intents):
+            result['intent_score'] = intent.score
+            result['intent_level'] = intent.level
+        
+        # 近似重复（跨平台转发、稍作改动的同一条求助）只保留评分最高的一条，source_urls记录全部链接
+        texts = [r.get('desc', '') + r.get('content', '') for r in all_results]
+        collapsed = []
+        for group in self.near_duplicates.cluster(texts):
+            members = [all_results[i] for i in group]
+            kept = max(members, key=lambda r: r.get('intent_score', 0))
+            if len(members) > 1:
+                kept['source_urls'] = list(dict.fromkeys(r['url'] for r in [kept] + members if r.get('url')))
+            collapsed.append(kept)
+        if len(collapsed) < len(all_results):
+            logger.info(f"  Collapsed {len(all_results) - len(collapsed)} near-duplicate results")
+        all_results = collapsed
         
         # 按意向排序
         all_results.sort(key=lambda x: x.get('intent_score', 0), reverse=True)
         
         return all_results
     
+    def mark_seen(self):
+        """把本次搜到的结果记入指纹库，之后的运行不再输出；在数据文件写入之后调用"""
+        if self.seen is not None and self._fingerprints:
+            added = self.seen.add(self._fingerprints)
+            logger.info(f"Recorded {added} new lead fingerprints ({len(self.seen)} total)")
+        self._fingerprints = []
+    
     def generate_report(self, keyword: str, results: List[Dict]) -> str:
         """生成报告"""
         # 统计
@@ -292,7 +303,7 @@ Sources: Douyin, Xiaohongshu
 | High Intent | {high} |
 | Medium Intent | {medium} |
 | Low Intent | {low} |
-| Avg Score | {sum(r.get('intent_score',0) for r in results)/len(results):.1f} |
+| Avg Score | {sum(r.get('intent_score',0) for r in results)/max(len(results), 1):.1f} |
 
 ---
 
@@ -348,6 +359,9 @@ Sources: Douyin, Xiaohongshu
         
         # Search
         results = self.search_all(keyword)
+        if not results:
+            print("\n No new results (seen in earlier runs), nothing written")
+            return results, None
         
         # Stats
         high = len([r for r in results if r.get('intent_level') == '高意向'])
@@ -364,6 +378,7 @@ Sources: Douyin, Xiaohongshu
         # Save data
         data_file = DATA_DIR / f"social_data_{keyword}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         data_file.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.mark_seen()
         
         print(f"\n Report: {report_file}")
         print(f" Data: {data_file}")
@@ -378,16 +393,17 @@ Sources: Douyin, Xiaohongshu
 def main():
     import sys
     
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if a != '--all']   # --all: include results seen in earlier runs
+    if not args:
         keyword = input("Enter keyword: ").strip()
     else:
-        keyword = sys.argv[1]
+        keyword = args[0]
     
     if not keyword:
         print("Please enter a keyword")
         return
     
-    searcher = SocialMediaSearcher()
+    searcher = SocialMediaSearcher(only_new='--all' not in sys.argv[1:])
     results, report_file = searcher.run_full_search(keyword)
 
 
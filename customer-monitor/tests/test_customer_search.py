@@ -0,0 +1,103 @@
+"""customer_search 并发搜索: 超时与平台并发限制"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "common"))
+
+import customer_search  # noqa: E402
+
+TIMEOUT = 0.5
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr(customer_search, "DATA_DIR", tmp_path)
+    m = customer_search.CustomerSearchMonitor(only_new=False)
+    m.config.sources = ['百度搜索', '知乎', '抖音搜索']
+    yield m
+    m.store.close()
+
+
+@pytest.fixture
+def hang():
+    """永不返回的搜索（测试结束时放行，避免线程残留）"""
+    forever = threading.Event()
+    yield lambda keyword: forever.wait()
+    forever.set()
+
+
+def found(source):
+    return lambda keyword: [f"{source}:{keyword}"]
+
+
+def test_hung_source_does_not_block_others(monitor, hang):
+    keywords = ['贷款', '征信', '借钱', '周转']
+    monitor.search_baidu = found('百度搜索')
+    monitor.search_zhihu = found('知乎')
+    monitor.search_douyin = hang
+
+    start = time.monotonic()
+    by_keyword = monitor._run_searches(keywords, TIMEOUT)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < TIMEOUT * 2
+    for kw in keywords:
+        assert by_keyword[kw] == [f"百度搜索:{kw}", f"知乎:{kw}"]
+        assert f"抖音搜索/{kw}" in monitor.search_errors
+    assert not any(key.startswith(('百度搜索/', '知乎/')) for key in monitor.search_errors)
+
+
+def test_queued_time_is_not_counted(monitor):
+    """抖音并发为1: 排队等待的搜索不因前面的搜索耗时而超时"""
+    def slow(keyword):
+        time.sleep(TIMEOUT * 0.6)
+        return [keyword]
+
+    monitor.config.sources = ['抖音搜索']
+    monitor.search_douyin = slow
+    keywords = ['贷款', '征信', '借钱']
+    by_keyword = monitor._run_searches(keywords, TIMEOUT)
+
+    assert monitor.search_errors == {}
+    assert all(by_keyword[kw] == [kw] for kw in keywords)
+
+
+def test_hung_searches_keep_platform_slots(monitor, hang):
+    """超时未返回的搜索仍占着平台的并发数，同一平台不会同时跑超过上限的搜索"""
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def tracked(keyword):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            return hang(keyword)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monitor.config.sources = ['知乎']
+    monitor.search_zhihu = tracked
+    keywords = [f"kw{i}" for i in range(6)]
+
+    start = time.monotonic()
+    monitor._run_searches(keywords, TIMEOUT)
+    elapsed = time.monotonic() - start
+
+    assert peak[0] == customer_search.PLATFORM_CONCURRENCY['知乎']
+    assert elapsed < TIMEOUT * 2
+    assert len(monitor.search_errors) == len(keywords)
+
+    # 下一次搜索时线程仍被占着: 不再启动新的搜索，立即放弃
+    start = time.monotonic()
+    monitor._run_searches(keywords, TIMEOUT)
+    assert time.monotonic() - start < TIMEOUT
+    assert peak[0] == customer_search.PLATFORM_CONCURRENCY['知乎']
+    assert len(monitor.search_errors) == len(keywords)
@@ -4,7 +4,6 @@
 看板式管理所有客户和工具状态
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -12,6 +11,8 @@ from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional
 from enum import Enum
 
+from lead_store import LEAD_STORE_DIR, LeadStore
+
 # 配置
 WORKSPACE_DIR = Path("/home/codespace/clawd")
 DATA_DIR = WORKSPACE_DIR / "customer-monitor" / "data"
@@ -149,12 +150,11 @@ class Workbench:
     
     def load_customers(self):
         """加载客户数据"""
-        # 从客户搜索结果加载
-        customer_files = list(DATA_DIR.glob("leads_*.json"))
-        for cf in customer_files[-3:]:  # 最近3个文件
+        # 从线索库加载
+        store = LeadStore(DATA_DIR / LEAD_STORE_DIR)
+        for run in store.runs()[-3:]:  # 最近3次搜索
             try:
-                data = json.loads(cf.read_text(encoding='utf-8'))
-                for item in data[:5]:  # 每个文件取前5个
+                for item in store.query(run=run, limit=5):  # 每次取评分最高的5个
                     if isinstance(item, dict):
                         self.customers.append(Customer(
                             id=item.get('id', ''),
@@ -170,6 +170,7 @@ class Workbench:
                         ))
             except Exception as e:
                 pass
+        store.close()
     
     def generate_dashboard(self) -> str:
         """生成仪表盘"""